@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" bench_domain.py -- Measure the parsing of the search domains
+
+Compare the literal scanner with the compiler, for the values of the
+string terms, then measure ``searchargs`` with and without the cache of
+the parsed terms.
+"""
+import optparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import erppeek
+
+VALUES = ['42', '0.5', '"draft"', "'out_invoice'", 'True', 'None',
+          '[1, 2, 3]', '("draft", "open")', 'Running', '2001-12-31']
+DOMAIN = ['state = draft', 'partner_id = 42', 'amount_total > 1000.0',
+          'type in ("out_invoice", "out_refund")', 'active = True',
+          'name ilike Agrolait', 'date_invoice >= 2001-12-31']
+
+
+def ast_only(expression):
+    try:
+        return erppeek._literal_eval_ast(expression)
+    except Exception:
+        return expression
+
+
+def scanner(expression):
+    try:
+        return erppeek.literal_eval(expression)
+    except Exception:
+        return expression
+
+
+def uncached_parse(domain):
+    parse = getattr(erppeek._parse_term, '__wrapped__', None)
+    if parse is None:       # Python 2
+        parse = erppeek._parse_term.__defaults__[0]
+    return [parse(term) for term in domain]
+
+
+def bench_values(number):
+    print('%-24s %10s %10s %8s' % ('value', 'compile', 'scanner', 'ratio'))
+    for value in VALUES:
+        slow = timeit.timeit(lambda: ast_only(value), number=number)
+        fast = timeit.timeit(lambda: scanner(value), number=number)
+        print('%-24s %9.3fs %9.3fs %7.1fx' % (value, slow, fast, slow / fast))
+
+
+def bench_searchargs(number):
+    parse = timeit.timeit(lambda: uncached_parse(DOMAIN), number=number)
+    cached = timeit.timeit(lambda: erppeek.searchargs((DOMAIN,)),
+                           number=number)
+    domain = erppeek.Domain(DOMAIN)
+    prepared = timeit.timeit(lambda: erppeek.searchargs((domain,)),
+                             number=number)
+    print('')
+    print('searchargs, %d terms x %d' % (len(DOMAIN), number))
+    print('%-24s %9.3fs' % ('parse each time', parse))
+    print('%-24s %9.3fs' % ('cached terms', cached))
+    print('%-24s %9.3fs' % ('Domain object', prepared))
+
+
+def main():
+    parser = optparse.OptionParser(description=__doc__.split('\n')[0])
+    parser.add_option('-n', '--number', type='int', default=20000,
+                      help='repeat each measure (default: %default)')
+    (args, __) = parser.parse_args()
+    bench_values(args.number)
+    bench_searchargs(args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+""" bench_rpc.py -- Compare XML-RPC and JSON-RPC on large 'read' results
+
+Without option, measure the encoding and decoding of a synthetic 'read'
+payload.  With the --server option, measure 'read' on a live instance.
+"""
+import json
+import optparse
+import os
+import sys
+import timeit
+try:                    # Python 3
+    from xmlrpc.client import dumps, loads
+except ImportError:     # Python 2
+    from xmlrpclib import dumps, loads
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import erppeek
+
+
+def sample_rows(count, many=40):
+    """Return a list of dicts, similar to the result of a 'read'."""
+    return [{
+        'id': idx,
+        'name': 'Partner %d' % idx,
+        'active': bool(idx % 7),
+        'credit_limit': idx * 1.5,
+        'comment': 'Lorem ipsum dolor sit amet ' * 4,
+        'parent_id': idx > 1 and [idx // 2, 'Partner %d' % (idx // 2)],
+        'category_id': list(range(idx, idx + many)),
+        'child_ids': list(range(idx * 10, idx * 10 + many // 4)),
+    } for idx in range(1, count + 1)]
+
+
+def bench_payload(rows, number):
+    xml_data = dumps(({'result': rows},), methodresponse=True,
+                     allow_none=True)
+    json_data = json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': rows})
+    results = [
+        ('xmlrpc', len(xml_data),
+         timeit.timeit(lambda: dumps((rows,), methodresponse=True,
+                                     allow_none=True), number=number),
+         timeit.timeit(lambda: loads(xml_data), number=number)),
+        ('jsonrpc', len(json_data),
+         timeit.timeit(lambda: json.dumps({'result': rows}), number=number),
+         timeit.timeit(lambda: json.loads(json_data), number=number)),
+    ]
+    print('%-8s %12s %10s %10s' % ('protocol', 'bytes', 'encode', 'decode'))
+    for (name, size, encode, decode) in results:
+        print('%-8s %12d %9.3fs %9.3fs' % (name, size, encode, decode))
+
+
+def bench_server(args, number):
+    for prefix in ('', 'jsonrpc+'):
+        client = erppeek.Client(prefix + args.server, args.db,
+                                args.user, args.password)
+        ids = client.search(args.model, [], limit=args.count)
+
+        def read():
+            client.read(args.model, ids, args.fields)
+        read()      # Warm up
+        elapsed = timeit.timeit(read, number=number)
+        print('%-8s %d records x %d: %.3fs' % (
+            prefix.rstrip('+') or 'xmlrpc', len(ids), number, elapsed))
+
+
+def main():
+    parser = optparse.OptionParser(description=__doc__.split('\n')[0])
+    parser.add_option('-n', '--number', type='int', default=5,
+                      help='repeat each measure (default: %default)')
+    parser.add_option('-c', '--count', type='int', default=5000,
+                      help='number of records (default: %default)')
+    parser.add_option('--server', help='URL of a live server')
+    parser.add_option('-d', '--db', help='database')
+    parser.add_option('-u', '--user', default='admin', help='username')
+    parser.add_option('-p', '--password', help='password')
+    parser.add_option('-m', '--model', default='res.partner',
+                      help='model to read (default: %default)')
+    parser.add_option('-f', '--fields', action='append',
+                      help='restrict the fields (multiple allowed)')
+    (args, __) = parser.parse_args()
+    if args.server:
+        bench_server(args, args.number)
+    else:
+        bench_payload(sample_rows(args.count), args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,29 +7,46 @@ Author: Florent Xicluna
 """
 import _ast
 import atexit
+import copy
 import csv
+import errno
 import functools
+import hashlib
+import itertools
+import json
 import optparse
 import os
 import re
 import shlex
+import socket
 import sys
+import threading
 import time
 import traceback
+import weakref
+from array import array
 try:                    # Python 3
     import configparser
+    import http.client as httplib
     from threading import current_thread
-    from xmlrpc.client import Fault, ServerProxy, MININT, MAXINT
+    from urllib.parse import urlsplit
+    from xmlrpc.client import (Fault, ProtocolError, ServerProxy, Transport,
+                               MININT, MAXINT)
     PY2 = False
 except ImportError:     # Python 2
     import ConfigParser as configparser
+    import httplib
     from threading import currentThread as current_thread
-    from xmlrpclib import Fault, ServerProxy, MININT, MAXINT
+    from urlparse import urlsplit
+    from xmlrpclib import (Fault, ProtocolError, ServerProxy, Transport,
+                           MININT, MAXINT)
     PY2 = True
 
 
 __version__ = '1.6.3'
-__all__ = ['Client', 'Model', 'Record', 'RecordList', 'Service',
+__all__ = ['Client', 'Model', 'Record', 'RecordList', 'Domain', 'Service',
+           'PooledTransport', 'JsonRpcTransport', 'Future', 'AsyncClient',
+           'AsyncModel', 'AsyncRecord', 'AsyncRecordList',
            'format_exception', 'read_config', 'start_odoo_services']
 
 CONF_FILE = 'erppeek.ini'
@@ -38,6 +55,11 @@ DEFAULT_URL = 'http://localhost:8069'
 DEFAULT_DB = 'openerp'
 DEFAULT_USER = 'admin'
 MAXCOL = [79, 179, 9999]    # Line length in verbose mode
+CHUNK_SIZE = 2000           # Records per call, for the chunked reads
+_ID_TYPECODE = 'i'          # The ids fit in 32 bits, like XML-RPC MAXINT
+_TERM_CACHE_SIZE = 4096     # String terms of the domains, already parsed
+# Values which are cached as written, without reading them again
+_CACHED_TYPES = frozenset(['boolean', 'char', 'integer', 'selection', 'text'])
 
 USAGE = """\
 Usage (some commands):
@@ -95,8 +117,17 @@ _obsolete_methods = {
 }
 _cause_message = ("\nThe above exception was the direct cause "
                   "of the following exception:\n\n")
+# Methods sent immediately inside a batch, because the result is needed
+_query_methods = frozenset([
+    'read', 'search', 'search_count', 'search_read', 'read_group',
+    'name_get', 'name_search', 'exists', 'fields_get', 'fields_get_keys',
+    'fields_view_get', 'get_views', 'load_views', 'default_get', 'onchange',
+    'check_access_rights', 'check_access_rule', 'export_data',
+    'perm_read', 'get_metadata'])
 _pending_state = ('state', 'not in',
                   ['uninstallable', 'uninstalled', 'installed'])
+# Errors raised when the server has closed a keep-alive connection
+_disconnected_errnos = (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
 
 if PY2:
     int_types = int, long
@@ -119,21 +150,42 @@ else:   # Python 3
     _DictWriter = csv.DictWriter
 
 
-def _memoize(inst, attr, value, doc_values=None):
+def _bind(inst, attr, value, doc_values=None):
     if hasattr(value, '__get__') and not hasattr(value, '__self__'):
         value.__name__ = attr
         if doc_values is not None:
             value.__doc__ %= doc_values
         value = value.__get__(inst, type(inst))
+    return value
+
+
+def _memoize(inst, attr, value, doc_values=None):
+    value = _bind(inst, attr, value, doc_values)
     inst.__dict__[attr] = value
     return value
 
 
+def _map_threaded(func, iterable, processes):
+    """Like ``map``, with a pool of threads.  Keep the order."""
+    from multiprocessing.pool import ThreadPool
+    items = list(iterable)
+    pool = ThreadPool(min(processes, len(items)) or 1)
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
 # Simplified ast.literal_eval which does not parse operators
-def _convert(node, _consts={'None': None, 'True': True, 'False': False}):
-    if isinstance(node, _ast.Str):
+def _convert(node, _consts={'None': None, 'True': True, 'False': False},
+             _Constant=getattr(_ast, 'Constant', ()),
+             _Str=getattr(_ast, 'Str', ()), _Num=getattr(_ast, 'Num', ())):
+    if isinstance(node, _Constant):
+        return node.value         # Python 3.6+
+    if isinstance(node, _Str):
         return node.s
-    if isinstance(node, _ast.Num):
+    if isinstance(node, _Num):
         return node.n
     if isinstance(node, _ast.Tuple):
         return tuple(map(_convert, node.elts))
@@ -149,13 +201,76 @@ def _convert(node, _consts={'None': None, 'True': True, 'False': False}):
     raise ValueError('malformed or disallowed expression')
 
 
-def literal_eval(expression, _octal_digits=frozenset('01234567')):
+# The common literals: a quoted string without escape, a float or an
+# integer without leading zero, or a name
+_literal_re = re.compile(
+    r"""\s*(?:'([^'\\\n]*)'|"([^"\\\n]*)"|((?:0|[1-9]\d*)\.\d*)"""
+    r"""|(0|[1-9]\d*)|([A-Za-z_]\w*))\s*""")
+_UNKNOWN = object()
+
+
+def _scan_literal(expression, _match=_literal_re.match,
+                  _consts={'None': None, 'True': True, 'False': False}):
+    """Parse the common literals, without compiling the expression.
+
+    Scalars, and flat lists or tuples of scalars, are recognized.
+    Return ``_UNKNOWN`` for the other expressions.
+    """
+    (opening, end) = (expression[:1], len(expression))
+    if opening in ('(', '['):
+        if expression[-1:] != (']' if opening == '[' else ')'):
+            return _UNKNOWN
+        (pos, end) = (1, end - 1)
+    else:
+        m = _match(expression)
+        if not m or m.end() != end:
+            return _UNKNOWN
+        return _literal_value(m.groups(), _consts)
+    (values, comma) = ([], False)
+    while pos < end:
+        m = _match(expression, pos, end)
+        if not m:
+            return _UNKNOWN
+        values.append(m.groups())
+        pos = m.end()
+        if pos < end:
+            if expression[pos] != ',':
+                return _UNKNOWN
+            (pos, comma) = (pos + 1, True)
+    values = [_literal_value(groups, _consts) for groups in values]
+    if opening == '[':
+        return values
+    if len(values) == 1 and not comma:
+        return values[0]    # Parentheses around a scalar
+    return tuple(values)
+
+
+def _literal_value(groups, consts):
+    (single, double, float_, int_, name) = groups
+    if name is not None:
+        if name not in consts:
+            raise ValueError('malformed or disallowed expression')
+        return consts[name]
+    if int_ is not None:
+        return int(int_)
+    if float_ is not None:
+        return float(float_)
+    return double if single is None else single
+
+
+def _literal_eval_ast(expression, _octal_digits=frozenset('01234567')):
     node = compile(expression, '<unknown>', 'eval', _ast.PyCF_ONLY_AST)
     if expression[:1] == '0' and expression[1:2] in _octal_digits:
         raise SyntaxError('unsupported octal notation')
-    value = _convert(node.body)
+    return _convert(node.body)
+
+
+def literal_eval(expression):
+    value = _scan_literal(expression)
+    if value is _UNKNOWN:
+        value = _literal_eval_ast(expression)
     if isinstance(value, int_types) and not MININT <= value <= MAXINT:
-         raise ValueError('overflow, int exceeds XML-RPC limits')
+        raise ValueError('overflow, int exceeds XML-RPC limits')
     return value
 
 
@@ -230,7 +345,8 @@ def read_config(section=None):
     Each section provides parameters for the connection: ``host``, ``port``,
     ``database``, ``user`` and (optional) ``password``.  Default values are
     read from the ``[DEFAULT]`` section.  If the ``password`` is not in the
-    configuration file, it is requested on login.
+    configuration file, it is requested on login.  The optional
+    ``protocol`` is ``xmlrpc`` (default) or ``jsonrpc``.
     Return a tuple ``(server, db, user, password or None)``.
     Without argument, it returns the list of configured environments.
     """
@@ -245,6 +361,8 @@ def read_config(section=None):
         server = shlex.split(env.get('options', ''))
     else:
         server = '%s://%s:%s' % (scheme, env['host'], env['port'])
+        if env.get('protocol') == 'jsonrpc':
+            server = 'jsonrpc+' + server
     return (server, env['database'], env['username'], env.get('password'))
 
 
@@ -293,6 +411,8 @@ def issearchdomain(arg):
       - ``['name = mushroom', 'state != draft']``
       - ``[]``
     """
+    if isinstance(arg, Domain):
+        return True
     return isinstance(arg, list) and not (arg and (
         # Not a list of ids: [1, 2, 3]
         isinstance(arg[0], int_types) or
@@ -300,25 +420,65 @@ def issearchdomain(arg):
         (isinstance(arg[0], basestring) and arg[0].isdigit())))
 
 
+def _parse_term(term):
+    """Parse a string term like ``'state = draft'``."""
+    m = _term_re.match(term.strip())
+    if not m:
+        raise ValueError('Cannot parse term %r' % term)
+    (field, operator, value) = m.groups()
+    try:
+        value = literal_eval(value)
+    except Exception:
+        # Interpret the value as a string
+        pass
+    return (field, operator, value)
+
+
+if hasattr(functools, 'lru_cache'):     # Python 3
+    _parse_term = functools.lru_cache(_TERM_CACHE_SIZE)(_parse_term)
+else:                                   # Python 2
+    def _parse_term(term, _parse=_parse_term, _cache={}):
+        try:
+            return _cache[term]
+        except KeyError:
+            if len(_cache) >= _TERM_CACHE_SIZE:
+                _cache.clear()
+            value = _cache[term] = _parse(term)
+        return value
+
+
+def _copy_term(term):
+    """Return the `term`, with a deep copy of its mutable value."""
+    if isinstance(term[2], (list, tuple, dict, set)):
+        term = term[:2] + (copy.deepcopy(term[2]),)
+    return term
+
+
+def _parse_domain(domain):
+    """Return a new list, where the string terms are parsed."""
+    parsed = []
+    for term in domain:
+        if isinstance(term, basestring) and term not in DOMAIN_OPERATORS:
+            # Do not share the cached value
+            term = _copy_term(_parse_term(term))
+        parsed.append(term)
+    return parsed
+
+
 def searchargs(params, kwargs=None, context=None):
-    """Compute the 'search' parameters."""
+    """Compute the 'search' parameters.
+
+    The `domain` is not modified: a new list is returned.
+    """
     if not params:
         return ([],)
     domain = params[0]
-    if not isinstance(domain, list):
+    if isinstance(domain, Domain):
+        domain = domain.to_list()
+    elif not isinstance(domain, list):
         return params
-    for (idx, term) in enumerate(domain):
-        if isinstance(term, basestring) and term not in DOMAIN_OPERATORS:
-            m = _term_re.match(term.strip())
-            if not m:
-                raise ValueError('Cannot parse term %r' % term)
-            (field, operator, value) = m.groups()
-            try:
-                value = literal_eval(value)
-            except Exception:
-                # Interpret the value as a string
-                pass
-            domain[idx] = (field, operator, value)
+    else:
+        domain = _parse_domain(domain)
     if (kwargs or context) and len(params) == 1:
         params = (domain,
                   kwargs.pop('offset', 0),
@@ -330,10 +490,460 @@ def searchargs(params, kwargs=None, context=None):
     return params
 
 
+class Domain(object):
+    """A search domain, parsed once.
+
+    The string terms like ``'state = draft'`` are parsed when the
+    ``Domain`` is created.  It is accepted instead of a list by the
+    search methods, which send it without parsing it again.  The
+    domains are combined with ``+``, like lists.
+    """
+    __slots__ = ('terms',)
+
+    def __init__(self, domain=()):
+        if isinstance(domain, Domain):
+            terms = domain.terms
+        else:
+            terms = tuple(_parse_domain(domain))
+        object.__setattr__(self, 'terms', terms)
+
+    def to_list(self):
+        """Return the domain as a list, as sent to the server."""
+        return [_copy_term(term) if isinstance(term, tuple) else term
+                for term in self.terms]
+
+    def __add__(self, other):
+        return Domain(self.terms + Domain(other).terms)
+
+    def __radd__(self, other):
+        return Domain(other) + self
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, Domain)):
+            return self.terms == Domain(other).terms
+        return NotImplemented
+
+    def __ne__(self, other):
+        rv = self.__eq__(other)
+        return rv if rv is NotImplemented else not rv
+
+    __hash__ = None
+
+    def __setattr__(self, attr, value):
+        raise AttributeError('Domain is read-only')
+
+    def __repr__(self):
+        return 'Domain(%r)' % (list(self.terms),)
+
+
+def _term_test(operator, value):
+    """Return a function which tests a value against a term."""
+    if operator == '=?':
+        if value is None or value is False:
+            return lambda val: True
+        operator = '='
+    if operator == '=':
+        return lambda val: val == value
+    if operator == '!=':
+        return lambda val: val != value
+    if operator in ('in', 'not in'):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        if operator == 'in':
+            return lambda val: val in values
+        return lambda val: val not in values
+    if operator in ('<', '>', '<=', '>='):
+        compare = {'<': lambda a, b: a < b, '>': lambda a, b: a > b,
+                   '<=': lambda a, b: a <= b, '>=': lambda a, b: a >= b,
+                   }[operator]
+        # Like SQL, the comparison with NULL is never true
+        return lambda val: (val is not None and val is not False and
+                            compare(val, value))
+    if operator.endswith('like'):
+        pattern = value if operator[:1] == '=' else '%%%s%%' % value
+        regex = ''.join(['.*' if char == '%' else '.' if char == '_' else
+                         re.escape(char) for char in pattern])
+        flags = re.DOTALL | (re.IGNORECASE if 'ilike' in operator else 0)
+        match = re.compile(regex + '$', flags).match
+        if operator[:4] == 'not ':
+            return lambda val: not (isinstance(val, basestring) and
+                                    match(val))
+        return lambda val: isinstance(val, basestring) and bool(match(val))
+    raise ValueError('Operator %r is not supported locally' % operator)
+
+
+def _x2many_test(operator, value):
+    """Return a function which tests a list of ids against a term."""
+    if operator not in ('=', '!=', 'in', 'not in'):
+        raise ValueError('Operator %r is not supported locally '
+                         'on a one2many or many2many field' % operator)
+    values = set(value if isinstance(value, (list, tuple)) else [value])
+    positive = operator in ('=', 'in')
+    if value is False:
+        return lambda ids: positive != bool(ids)
+    return lambda ids: positive != values.isdisjoint(ids)
+
+
+def _compile_term(term, fields):
+    """Return a function which tests a row against a term."""
+    (name, operator, value) = term
+    if not isinstance(name, basestring):    # like (1, '=', 1)
+        result = _term_test(operator, value)(name)
+        return lambda row: result
+    if '.' in name:
+        raise ValueError('Field %r is not supported locally' % name)
+    field_type = (fields.get(name) or {}).get('type')
+    if field_type in ('one2many', 'many2many'):
+        test = _x2many_test(operator, value)
+        return lambda row: test(row[name] or ())
+    test = _term_test(operator, value)
+    if field_type == 'many2one':
+        # Compare the name if the value is a string, else the id
+        first = value[0] if isinstance(value, (list, tuple)) else value
+        idx = 1 if isinstance(first, basestring) else 0
+        return lambda row: test(row[name] and row[name][idx])
+    return lambda row: test(row[name])
+
+
+def _compile_domain(domain, fields):
+    """Prepare the search `domain` for the local evaluation.
+
+    Return a tuple ``(names, match)``, where `names` is the list of the
+    fields used in the domain and ``match(row)`` tests a dictionary of
+    values, as returned by ``read``.  The `fields` give the type of the
+    fields, as returned by ``fields_get``.
+    """
+    (names, stack) = ([], [])
+    try:
+        for term in reversed(Domain(domain).terms):
+            if term == '!':
+                stack.append(functools.partial(
+                    lambda test, row: not test(row), stack.pop()))
+            elif term in ('&', '|'):
+                (test1, test2) = (stack.pop(), stack.pop())
+                if term == '&':
+                    test = (lambda t1, t2, row: t1(row) and t2(row))
+                else:
+                    test = (lambda t1, t2, row: t1(row) or t2(row))
+                stack.append(functools.partial(test, test1, test2))
+            else:
+                if isinstance(term[0], basestring) and term[0] not in names:
+                    names.append(term[0])
+                stack.append(_compile_term(term, fields))
+    except IndexError:
+        raise ValueError('Invalid domain %r' % (domain,))
+    # The remaining terms are combined with '&'
+    tests = stack[::-1]
+    return (names, lambda row: all([test(row) for test in tests]))
+
+
 class Error(Exception):
     """An ERPpeek error."""
 
 
+class Future(object):
+    """The pending result of a call queued in a :meth:`Client.batch`.
+
+    The value is available when the batch is sent.
+    """
+    _value = _exception = None
+    _done = False
+
+    def __init__(self, transform=None):
+        self._transform = transform
+        self._chained = []
+
+    def __repr__(self):
+        state = 'finished' if self._done else 'pending'
+        return '<Future %s>' % (state,)
+
+    def done(self):
+        """Return True if the batch has been sent."""
+        return self._done
+
+    def result(self):
+        """Return the value of the call, or raise its exception."""
+        if not self._done:
+            raise Error('Batch is not sent yet')
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+    def then(self, func):
+        """Return a new :class:`Future` for ``func(self.result())``."""
+        future = Future(func)
+        if self._done:
+            future._resolve(self._value, self._exception)
+        else:
+            self._chained.append(future)
+        return future
+
+    def _resolve(self, value, exception=None):
+        if exception is None and self._transform is not None:
+            try:
+                value = self._transform(value)
+            except Exception as exc:
+                exception = exc
+        (self._value, self._exception) = (value, exception)
+        self._done = True
+        for future in self._chained:
+            future._resolve(value, exception)
+        del self._chained[:]
+
+
+class _Batch(object):
+    """Queue the calls of a :class:`Client` and send them together."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __enter__(self):
+        if self.client._batch is not None:
+            raise Error('A batch is already active')
+        self.client._batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.client._batch = None
+        if exc_type is None:
+            self.send()
+        else:
+            self.abort()
+
+    def add(self, args, transform=None):
+        future = Future(transform)
+        self.calls.append((args, future))
+        return future
+
+    def send(self):
+        """Send the queued calls and resolve their :class:`Future`."""
+        (calls, self.calls) = (self.calls, [])
+        if not calls:
+            return
+        results = self.client._multicall([args for (args, f) in calls])
+        if results is None:
+            # Fallback: one call after the other, on the same connection
+            results = []
+            for (args, future) in calls:
+                try:
+                    results.append((self.client._execute(*args), None))
+                except Exception as exc:
+                    results.append((None, exc))
+        for ((args, future), (value, exc)) in zip(calls, results):
+            future._resolve(value, exc)
+
+    def abort(self):
+        """Drop the queued calls, and resolve their :class:`Future`."""
+        (calls, self.calls) = (self.calls, [])
+        for (args, future) in calls:
+            future._resolve(None, Error('Batch aborted'))
+
+
+class _Session(object):
+    """Buffer the attribute assignments of the records of a :class:`Client`.
+
+    The values are merged per record, and they are written with
+    :meth:`Model.write_many` on :meth:`commit`.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.pending = {}
+
+    def __enter__(self):
+        if self.client._session is not None:
+            raise Error('A session is already active')
+        self.client._session = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.client._session = None
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def add(self, record, values):
+        key = (record._model_name, repr(record._context))
+        (model, context, values_by_id, records) = self.pending.setdefault(
+            key, (record._model, record._context, {}, []))
+        values_by_id.setdefault(record.id, {}).update(values)
+        records.append(record)
+        if record._prefetch is not None:
+            record._prefetch.discard(record.id)
+        for attr in values:
+            record._values.pop(attr, None)
+
+    def commit(self):
+        """Write the pending values."""
+        (pending, self.pending) = (self.pending, {})
+        for (model, context, values_by_id, records) in pending.values():
+            model.write_many(values_by_id, context=context)
+            for record in records:
+                record.refresh()
+
+    def rollback(self):
+        """Forget the pending values."""
+        self.pending.clear()
+
+
+class PooledTransport(Transport):
+    """An XML-RPC transport which keeps HTTP/1.1 connections alive.
+
+    The same transport is shared by all the services of a :class:`Client`,
+    and it is safe to use from multiple threads.  Each request borrows an
+    idle connection from the pool, or opens a new one.  At most `pool_size`
+    idle connections are kept per host, and they are dropped when they stay
+    unused for more than `idle_timeout` seconds.  If a reused connection was
+    closed by the server (broken pipe, connection reset), the request is
+    sent again on a fresh connection.
+
+    Set `secure` to :const:`True` for HTTPS.  The optional `timeout` is the
+    socket timeout in seconds, and the optional `context` is the
+    ``ssl.SSLContext`` of the HTTPS connections.
+    """
+
+    def __init__(self, secure=False, pool_size=4, idle_timeout=60.0,
+                 timeout=None, context=None, use_datetime=False):
+        Transport.__init__(self, use_datetime=use_datetime)
+        self.secure = secure
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.context = context
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _new_connection(self, host):
+        kwargs = {}
+        if self.timeout is not None:
+            kwargs['timeout'] = self.timeout
+        chost = self.get_host_info(host)[0]
+        if not self.secure:
+            return httplib.HTTPConnection(chost, **kwargs)
+        if self.context is not None:
+            kwargs['context'] = self.context
+        return httplib.HTTPSConnection(chost, **kwargs)
+
+    def _acquire(self, host):
+        now = time.time()
+        with self._lock:
+            idle = self._idle.get(host)
+            while idle:
+                (conn, last_used) = idle.pop()
+                if now - last_used < self.idle_timeout:
+                    return (conn, True)
+                conn.close()
+        return (self._new_connection(host), False)
+
+    def _release(self, host, conn):
+        with self._lock:
+            idle = self._idle.setdefault(host, [])
+            if len(idle) < self.pool_size:
+                idle.append((conn, time.time()))
+                return
+        conn.close()
+
+    content_type = 'text/xml'
+
+    def _send(self, conn, host, handler, request_body, verbose):
+        extra_headers = self.get_host_info(host)[1]
+        if verbose:
+            conn.set_debuglevel(1)
+        conn.putrequest('POST', handler)
+        headers = list(extra_headers or ()) + [
+            ('Content-Type', self.content_type),
+            ('User-Agent', self.user_agent),
+            ('Content-Length', str(len(request_body)))]
+        for (key, val) in headers:
+            conn.putheader(key, val)
+        conn.endheaders(request_body)
+        return conn.getresponse()
+
+    def request(self, host, handler, request_body, verbose=False):
+        (conn, reused) = self._acquire(host)
+        try:
+            try:
+                resp = self._send(conn, host, handler, request_body, verbose)
+            except (socket.error, httplib.BadStatusLine) as exc:
+                # Retry once if the keep-alive connection has gone cold
+                if not reused or not (isinstance(exc, httplib.BadStatusLine)
+                                      or exc.errno in _disconnected_errnos):
+                    raise
+                conn.close()
+                conn = self._new_connection(host)
+                resp = self._send(conn, host, handler, request_body, verbose)
+            if resp.status != 200:
+                resp.read()
+                raise ProtocolError(host + handler, resp.status,
+                                    resp.reason, resp.msg)
+            self.verbose = verbose
+            result = self.parse_response(resp)
+        except Fault:
+            # The response is complete, the connection is still valid
+            self._release(host, conn)
+            raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(host, conn)
+        return result
+
+    def close(self):
+        """Close the idle connections."""
+        with self._lock:
+            (idle, self._idle) = (self._idle, {})
+        for conns in idle.values():
+            for (conn, last_used) in conns:
+                conn.close()
+
+
+class JsonRpcTransport(PooledTransport):
+    """A transport for the JSON-RPC API of Odoo (>= 8.0).
+
+    It is a drop-in alternative to XML-RPC, with the same services and the
+    same keep-alive connections as :class:`PooledTransport`.  The payloads
+    are smaller and faster to decode, especially for large ``read``
+    results.  An error returned by the server is raised as a ``Fault``.
+
+    It is selected with a ``jsonrpc+`` prefix on the URL of the
+    :class:`Client` (e.g. ``jsonrpc+https://odoo.example.com``),
+    or with ``protocol = jsonrpc`` in the configuration file.
+    """
+    content_type = 'application/json'
+
+    def __init__(self, *args, **kwargs):
+        PooledTransport.__init__(self, *args, **kwargs)
+        self._ids = itertools.count(1)
+
+    def parse_response(self, response):
+        return json.loads(response.read().decode('utf-8'))
+
+    def dispatch(self, host, handler, service, method, params):
+        """Call the `method` of the `service` and return the result."""
+        body = json.dumps({
+            'jsonrpc': '2.0', 'method': 'call', 'id': next(self._ids),
+            'params': {'service': service, 'method': method,
+                       'args': list(params)},
+        }).encode('utf-8')
+        response = self.request(host, handler, body)
+        error = response.get('error')
+        if error:
+            data = error.get('data') or {}
+            message = data.get('message') or error.get('message')
+            if data.get('exception_type') in ('user_error', 'warning') or \
+                    data.get('name', '').endswith(('Warning', 'UserError')):
+                message = 'warning -- %s' % (message,)
+            raise Fault(message, data.get('debug') or '')
+        return response.get('result')
+
+
 class Service(object):
     """A wrapper around XML-RPC endpoints.
 
@@ -350,11 +960,18 @@ class Service(object):
 
     def __init__(self, server, endpoint, methods,
                  transport=None, verbose=False):
-        if isinstance(server, basestring):
+        if isinstance(transport, JsonRpcTransport):
+            self._rpcpath = server + '/jsonrpc/'
+            (__, host, path) = urlsplit(server)[:3]
+            rpc = functools.partial(transport.dispatch,
+                                    host, path + '/jsonrpc', endpoint)
+        elif isinstance(server, basestring):
             self._rpcpath = rpcpath = server + '/xmlrpc/'
             proxy = ServerProxy(rpcpath + endpoint,
                                 transport=transport, allow_none=True)
-            if hasattr(proxy._ServerProxy__transport, 'close'):   # >= 2.7
+            # Do not close a transport which is shared with other services
+            if transport is None and hasattr(proxy._ServerProxy__transport,
+                                             'close'):   # >= 2.7
                 self.close = proxy._ServerProxy__transport.close
             rpc = proxy._ServerProxy__request
         elif server._api_v7:
@@ -412,23 +1029,58 @@ class Client(object):
 
     This is the top level object.
     The `server` is the URL of the instance, like ``http://localhost:8069``.
+    Prefix the URL with ``jsonrpc+`` to use the JSON-RPC protocol instead
+    of XML-RPC (Odoo >= 8.0).
     If `server` is an ``openerp`` module, it is used to connect to the local
     server (>= 6.1).
 
     The `db` is the name of the database and the `user` should exist in the
     table ``res.users``.  If the `password` is not provided, it will be
     asked on login.
+
+    With `identity_map`, the client returns the same :class:`Record`
+    object for a given model, id and context, as long as it is referenced.
+    Hence the values read on a record are shared by all its references.
+
+    With `schema_cache`, the fields of the models are stored in a JSON
+    file in this directory.  There is a file for each server, database,
+    and user.  The file is discarded when the installed modules
+    change, or when modules are upgraded with this client.
+
+    With `xml_id_index`, the External IDs are resolved from an index of
+    ``ir.model.data``, built module by module on first use.  On a miss,
+    the entries of the module which are new or modified since the last
+    read are retrieved.  The entries which are deleted on the server are
+    not detected.  The index is saved in the `schema_cache` directory,
+    if any.
+
+    The attribute `method_refresh` controls the cache of a :class:`Record`
+    after a method call like ``record.action_confirm()``.  If it is true
+    (default), the cached values are discarded.  If it is false, they are
+    kept.  It can be a dictionary ``{method: [field, ...]}`` to discard
+    only some fields after these methods.
     """
     _config_file = os.path.join(os.curdir, CONF_FILE)
 
     def __init__(self, server, db=None, user=None, password=None,
-                 transport=None, verbose=False):
+                 transport=None, verbose=False, identity_map=False,
+                 schema_cache=None, xml_id_index=False):
         if isinstance(server, list):
             appname = os.path.basename(__file__).rstrip('co')
             server = start_odoo_services(server, appname=appname)
         elif isinstance(server, basestring) and server[-1:] == '/':
             server = server.rstrip('/')
+        if isinstance(server, basestring) and server.startswith('jsonrpc+'):
+            server = server[8:]
+            if transport is None:
+                transport = JsonRpcTransport(server.startswith('https:'))
+            elif not isinstance(transport, JsonRpcTransport):
+                raise Error('JSON-RPC requires a JsonRpcTransport')
+        if transport is None and isinstance(server, basestring):
+            # Keep-alive connections, shared by all the services
+            transport = PooledTransport(secure=server.startswith('https:'))
         self._server = server
+        self._transport = transport
         float_version = 99.0
 
         def get_proxy(name):
@@ -439,14 +1091,20 @@ class Client(object):
         self.server_version = ver = get_proxy('db').server_version()
         self.major_version = re.match('\d+\.?\d*', ver).group()
         float_version = float(self.major_version)
+        self._search_read = float_version >= 8.0
         # Create the XML-RPC proxies
         self.db = get_proxy('db')
         self.common = get_proxy('common')
         self._object = get_proxy('object')
         self._report = get_proxy('report')
         self._wizard = get_proxy('wizard') if float_version < 7.0 else None
+        self._identity_map = identity_map
+        self._schema_cache = schema_cache
+        self._xml_id_index = xml_id_index
+        self.method_refresh = True
         self.reset()
         self.context = None
+        self._batch = self._multicall_supported = self._session = None
         if db:
             # Try to login
             self.login(user, password=password, database=db)
@@ -471,6 +1129,13 @@ class Client(object):
         self.user = self._environment = None
         self._db, self._models = (), {}
         self._execute = self._exec_workflow = None
+        if self._identity_map:
+            self._records = weakref.WeakValueDictionary()
+        else:
+            self._records = None
+        # The contexts of the identity map, for each model
+        self._record_contexts = {}
+        self._schema = self._xml_ids = None
 
     def __repr__(self):
         return "<Client '%s#%s'>" % (self._server or '', self._db)
@@ -509,6 +1174,7 @@ class Client(object):
         # Authenticated endpoints
         def authenticated(method):
             return functools.partial(method, self._db, uid, password)
+        self._credentials = (self._db, uid, password)
         self._execute = authenticated(self._object.execute)
         self._exec_workflow = authenticated(self._object.exec_workflow)
         self.report = authenticated(self._report.report)
@@ -669,9 +1335,26 @@ class Client(object):
         assert self.user, 'Not connected'
         assert isinstance(obj, basestring)
         assert isinstance(method, basestring) and method != 'browse'
+        if self._session is not None and self._session.pending:
+            # Write the pending values before they are read
+            self._session.commit()
         context = kwargs.pop('context', None)
         ordered = single_id = False
-        if method == 'read':
+        chunk_size = method == 'read' and kwargs.pop('chunk_size', None)
+        parallel = method == 'read' and kwargs.pop('parallel', None)
+        if method == 'read' and params and self._search_read and \
+                not (chunk_size or parallel) and issearchdomain(params[0]):
+            # Odoo >= 8: a single call, which keeps the order of the search
+            search_params = searchargs(params[:1], kwargs, context)
+            (domain, offset, limit, order) = \
+                (search_params + (0, None, None))[:4]
+            if len(params) > 1:
+                fields = params[1]
+            else:
+                fields = kwargs.pop('fields', None)
+            method = 'search_read'
+            params = (domain, fields, offset, limit, order) + params[2:]
+        elif method == 'read':
             assert params
             if issearchdomain(params[0]):
                 # Combine search+read
@@ -709,15 +1392,108 @@ class Client(object):
         # Ignore extra keyword arguments
         for item in kwargs.items():
             print('Ignoring: %s = %r' % item)
-        res = self._execute(obj, method, *params)
-        if ordered:
-            # The results are not in the same order as the ids
-            # when received from the server
-            resdic = dict([(val['id'], val) for val in res])
-            if not isinstance(ordered, list):
-                ordered = ids
-            res = [resdic.get(id_, False) for id_ in ordered]
-        return res[0] if single_id else res
+
+        def result(res):
+            if ordered:
+                # The results are not in the same order as the ids
+                # when received from the server
+                resdic = dict([(val['id'], val) for val in res])
+                res = [resdic.get(id_, False) for id_ in
+                       (ordered if isinstance(ordered, list) else ids)]
+            return res[0] if single_id else res
+        if self._batch is not None and method not in _query_methods:
+            return self._batch.add((obj, method) + params, result)
+        if parallel and not chunk_size:
+            chunk_size = -(-len(ids) // parallel)
+        if chunk_size and len(ids) > chunk_size:
+            # Split the ids to limit the size of each request
+            chunks = [ids[idx:idx + chunk_size]
+                      for idx in range(0, len(ids), chunk_size)]
+
+            def read_chunk(chunk_ids):
+                return self._execute(obj, method, chunk_ids, *params[1:])
+            if parallel and parallel > 1 and \
+                    self._grow_pool(min(parallel, len(chunks))):
+                pages = _map_threaded(read_chunk, chunks, parallel)
+            else:
+                pages = map(read_chunk, chunks)
+            return result([row for page in pages for row in page])
+        return result(self._execute(obj, method, *params))
+
+    def batch(self):
+        """Return a context manager which queues the RPC calls.
+
+        Inside the ``with`` block, the methods which change data
+        (``create``, ``write``, ``unlink``, workflow buttons, ...) are not
+        sent immediately.  They return a :class:`Future` instead, and they
+        are sent together at the end of the block.  The queries are still
+        sent immediately, because their result is needed to continue:
+        ``read``, ``search``, ``search_count``, ``search_read``,
+        ``read_group``, ``name_get``, ``name_search``, ``exists``,
+        ``fields_get``, ``fields_get_keys``, ``fields_view_get``,
+        ``get_views``, ``load_views``, ``default_get``, ``onchange``,
+        ``check_access_rights``, ``check_access_rule``, ``export_data``,
+        ``perm_read`` and ``get_metadata``.  Any other method returns a
+        :class:`Future`.
+
+        If the server supports ``system.multicall``, the queued calls are
+        sent in a single request.  Otherwise, they are sent one after the
+        other on the same keep-alive connection.  If a call fails, the
+        exception is raised by :meth:`Future.result`, and the following
+        calls are still sent.  If the block raises an exception, the calls
+        are not sent, and their :class:`Future` raise an :class:`Error`.
+
+            with client.batch():
+                for vals in lines:
+                    client.ResPartner.create(vals)
+        """
+        return _Batch(self)
+
+    def _grow_pool(self, size):
+        """Keep at least `size` idle connections, for concurrent calls.
+
+        Return False if the transport is not a :class:`PooledTransport`:
+        the other transports are not safe to use from multiple threads.
+        """
+        if not isinstance(self._transport, PooledTransport):
+            return False
+        if self._transport.pool_size < size:
+            self._transport.pool_size = size
+        return True
+
+    def session(self):
+        """Return a context manager which buffers the record assignments.
+
+        Inside the ``with`` block, the values assigned to the attributes
+        of the records are not written immediately.  They are merged for
+        each record, and they are written with :meth:`Model.write_many`
+        when the block exits, or before the next call to the server.
+        If an exception is raised in the block, the values which are not
+        written yet are discarded.
+
+            with client.session():
+                for partner in partners:
+                    partner.ref = partner.name.upper()
+                    partner.active = True
+        """
+        return _Session(self)
+
+    def _multicall(self, calls):
+        # Return a list of (value, exception), or None if not supported
+        if self._multicall_supported is False or \
+                not isinstance(self._server, basestring):
+            return None
+        requests = [{'methodName': 'execute',
+                     'params': self._credentials + args} for args in calls]
+        try:
+            results = self._object._dispatch('system.multicall', (requests,))
+        except Fault:
+            self._multicall_supported = False
+            return None
+        self._multicall_supported = True
+        return [(None, Fault(res['faultCode'], res['faultString']))
+                if isinstance(res, dict) else (res[0], None)
+                for res in results]
 
     def exec_workflow(self, obj, signal, obj_id):
         """Wrapper around ``object.exec_workflow`` RPC method.
@@ -799,6 +1575,8 @@ class Client(object):
 
         # Empty the models' cache
         self._models.clear()
+        self._schema_clear()
+        self._xml_ids_clear()
 
         # Apply scheduled upgrades
         if self.major_version == '5.0':
@@ -860,7 +1638,18 @@ class Client(object):
         The optional keyword arguments `offset`, `limit` and `order` are
         used to restrict the search.  The `order` is also used to order the
         results returned.  Note: the low-level RPC method ``read`` itself does
-        not preserve the order of the results.
+        not preserve the order of the results.  With Odoo 8.0 and newer, a
+        search `domain` is read with a single ``search_read`` call, which
+        returns the results in the order of the search.
+
+        The optional keyword argument `chunk_size` splits the ids in
+        multiple ``read`` calls of at most `chunk_size` records each.
+        With the keyword argument `parallel`, these calls are sent
+        concurrently on `parallel` connections.  If `chunk_size` is
+        not set, the ids are split in `parallel` chunks of equal size.
+        The pool of connections of the :class:`PooledTransport` is
+        enlarged to `parallel` if needed.  With another transport, the
+        calls are sent one after the other.
         """
         fmt = None
         if len(params) > 1 and isinstance(params[1], basestring):
@@ -886,6 +1675,141 @@ class Client(object):
             return res[fields[0]]
         return res
 
+    def read_chunks(self, obj, *params, **kwargs):
+        """Read the records in chunks, and yield a list for each chunk.
+
+        The arguments are the same as :meth:`read`.  The optional keyword
+        argument `chunk_size` is the number of records of each chunk
+        (default 2000).  The records are read when the next chunk is
+        requested, so the memory use does not depend on the size of the
+        selection.  Use ``itertools.chain.from_iterable`` to iterate over
+        the records.
+        """
+        chunk_size = kwargs.pop('chunk_size', None) or CHUNK_SIZE
+        (ids, params) = (params[0], params[1:])
+        if issearchdomain(ids):
+            search_kwargs = dict([(key, kwargs.pop(key)) for key in
+                                  ('offset', 'limit', 'order', 'context')
+                                  if key in kwargs])
+            ids = self.search(obj, ids, **search_kwargs)
+            kwargs['order'] = True
+            if 'context' in search_kwargs:
+                kwargs['context'] = search_kwargs['context']
+        elif not isinstance(ids, list):
+            ids = [ids] if ids else []
+        for idx in range(0, len(ids), chunk_size):
+            yield self.read(obj, ids[idx:idx + chunk_size], *params, **kwargs)
+
+    def _schema_path(self, suffix='.json'):
+        # The 'fields_get' calls are sent without context: ignore the lang
+        key = '%s#%s#%s' % (self._server, self._db, self.user)
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return os.path.join(self._schema_cache, digest + suffix)
+
+    def _schema_load(self, path):
+        modules = self.read('ir.module.module', [('state', '=', 'installed')],
+                            'name latest_version')
+        modules = sorted([(mod['name'], mod['latest_version'])
+                          for mod in modules])
+        fingerprint = hashlib.md5(
+            json.dumps(modules).encode('utf-8')).hexdigest()
+        try:
+            with open(path) as f:
+                schema = json.load(f)
+        except (IOError, ValueError):
+            schema = None
+        if not schema or schema.get('fingerprint') != fingerprint:
+            schema = {'fingerprint': fingerprint, 'models': {}}
+        return schema
+
+    def _schema_save(self, path, value):
+        if not os.path.isdir(self._schema_cache):
+            os.makedirs(self._schema_cache)
+        tmp_path = '%s.%d' % (path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f)
+        getattr(os, 'replace', os.rename)(tmp_path, path)
+
+    def _schema_get(self, model, attr, compute):
+        """Return the `attr` of the `model` from the schema cache.
+
+        On a cache miss, call `compute` and store the result.
+        """
+        if not self._schema_cache:
+            return compute()
+        path = self._schema_path()
+        if self._schema is None or self._schema[0] != path:
+            # Loaded on first use, and again after a change of user
+            self._schema = (path, self._schema_load(path))
+        schema = self._schema[1]
+        models = schema['models']
+        try:
+            return models[model][attr]
+        except KeyError:
+            value = models.setdefault(model, {})[attr] = compute()
+            self._schema_save(path, schema)
+            return value
+
+    def _schema_clear(self):
+        """Discard the schema cache."""
+        self._schema = None
+        if self._schema_cache and os.path.exists(self._schema_path()):
+            os.remove(self._schema_path())
+
+    def _xml_id_get(self, module, name):
+        """Return the ``[model, res_id]`` of an External ID, or None.
+
+        The entries of the `module` are refreshed on first use, and
+        when the `name` is missing.
+        """
+        if self._xml_ids is None:
+            self._xml_ids = self._xml_ids_load()
+        entry = self._xml_ids.get(module)
+        if entry is None or not entry['fresh'] or name not in entry['names']:
+            entry = self._xml_ids_refresh(module)
+        return entry['names'].get(name)
+
+    def _xml_ids_load(self):
+        xml_ids = {}
+        if self._schema_cache:
+            try:
+                with open(self._schema_path('.xml_ids.json')) as f:
+                    xml_ids = json.load(f)
+            except (IOError, ValueError):
+                pass
+        for entry in xml_ids.values():
+            entry['fresh'] = False
+        return xml_ids
+
+    def _xml_ids_refresh(self, module):
+        """Read the entries of the `module` added or modified since the
+        last refresh, according to the ``id`` and ``write_date``."""
+        entry = self._xml_ids.setdefault(
+            module, {'names': {}, 'last_id': 0, 'write_date': ''})
+        domain = [('module', '=', module), ('id', '>', entry['last_id'])]
+        if entry['write_date']:
+            domain[1:] = ['|', domain[1],
+                          ('write_date', '>=', entry['write_date'])]
+        rows = self.read('ir.model.data', domain,
+                         'name model res_id write_date')
+        for row in rows:
+            entry['names'][row['name']] = [row['model'], row['res_id']]
+            entry['last_id'] = max(entry['last_id'], row['id'])
+            entry['write_date'] = max(entry['write_date'],
+                                      row['write_date'] or '')
+        entry['fresh'] = True
+        if rows and self._schema_cache:
+            self._schema_save(self._schema_path('.xml_ids.json'),
+                              self._xml_ids)
+        return entry
+
+    def _xml_ids_clear(self):
+        """Discard the index of External IDs."""
+        self._xml_ids = None
+        path = self._schema_cache and self._schema_path('.xml_ids.json')
+        if path and os.path.exists(path):
+            os.remove(path)
+
     def _models_get(self, name):
         try:
             return self._models[name]
@@ -989,11 +1913,20 @@ class Client(object):
             return self.execute(obj, method, *params, **kwargs)
         return _memoize(self, method, wrapper, method)
 
+    def close(self):
+        """Close the idle connections of the transport.
+
+        The connections are opened again on the next call.
+        """
+        if hasattr(self._transport, 'close'):
+            self._transport.close()
+
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, tb):
         self.reset()
+        self.close()
 
 
 class Model(object):
@@ -1010,6 +1943,8 @@ class Model(object):
         m.search = functools.partial(client.search, name)
         m.count = functools.partial(client.count, name)
         m.read = functools.partial(client.read, name)
+        # The _Prefetch of the RecordList, invalidated after a write
+        m._prefetch_groups = weakref.WeakValueDictionary()
         return m
 
     def __repr__(self):
@@ -1021,6 +1956,14 @@ class Model(object):
         return obj_keys
 
     def _get_fields(self):
+        if float(self.client.major_version) < 8.0:
+            return self._all_fields
+        # Only the attributes which are needed to wrap the values
+        return self.client.execute_kw(self._name, 'fields_get', [],
+                                      {'attributes': ['type', 'relation',
+                                                      'depends']})
+
+    def _get_all_fields(self):
         return self._execute('fields_get')
 
     def keys(self):
@@ -1035,14 +1978,15 @@ class Model(object):
         If omitted, all fields are returned.
         """
         if names is None:
-            return self._fields
+            return self._all_fields
         if isinstance(names, basestring):
             names = names.split()
-        return dict([(k, v) for (k, v) in self._fields.items() if k in names])
+        return dict([(k, v) for (k, v) in self._all_fields.items()
+                     if k in names])
 
     def field(self, name):
         """Return the field properties for field `name`."""
-        return self._fields[name]
+        return self._all_fields[name]
 
     def access(self, mode="read"):
         """Check if the user has access to this model.
@@ -1091,10 +2035,16 @@ class Model(object):
             return Record(self, domain, context=context)
         if isinstance(domain, basestring):  # lookup the xml_id
             (module, name) = domain.split('.')
-            data = self._imd_read(
-                [('module', '=', module), ('name', '=', name)], 'model res_id')
-            assert not data or data[0]['model'] == self._name
-            ids = [res['res_id'] for res in data]
+            if self.client._xml_id_index:
+                data = self.client._xml_id_get(module, name)
+                assert not data or data[0] == self._name
+                ids = [data[1]] if data else []
+            else:
+                data = self._imd_read(
+                    [('module', '=', module), ('name', '=', name)],
+                    'model res_id')
+                assert not data or data[0]['model'] == self._name
+                ids = [res['res_id'] for res in data]
         else:                               # a search domain
             assert issearchdomain(domain)
             params = searchargs((domain,), {}, context)
@@ -1103,6 +2053,108 @@ class Model(object):
             raise ValueError('domain matches too many records (%d)' % len(ids))
         return Record(self, ids[0], context=context) if ids else None
 
+    def get_many(self, xml_ids, context=None):
+        """Return a :class:`RecordList` for the list of `xml_ids`.
+
+        The External IDs are resolved with a single call, or from the
+        index of the client if enabled.  The records
+        are in the same order as the `xml_ids`.  The ``id`` is False
+        when the External ID is not found for this model.
+        """
+        names_by_module = {}
+        for xml_id in xml_ids:
+            (module, name) = xml_id.split('.')
+            names_by_module.setdefault(module, set()).add(name)
+        domain = [('model', '=', self._name)]
+        domain += ['|'] * (len(names_by_module) - 1)
+        for (module, names) in sorted(names_by_module.items()):
+            domain += ['&', ('module', '=', module),
+                       ('name', 'in', sorted(names))]
+        res_ids = {}
+        if self.client._xml_id_index:
+            for xml_id in set(xml_ids):
+                data = self.client._xml_id_get(*xml_id.split('.'))
+                if data and data[0] == self._name:
+                    res_ids[xml_id] = data[1]
+        elif names_by_module:
+            for rec in self._imd_read(domain, 'module name res_id'):
+                res_ids['%(module)s.%(name)s' % rec] = rec['res_id']
+        return RecordList(self, [res_ids.get(xml_id, False)
+                                 for xml_id in xml_ids], context=context)
+
+    def filter_local(self, rows, domain):
+        """Return the `rows` which match the search `domain`.
+
+        The `rows` are dictionaries of values, as returned by
+        :meth:`Client.read` or ``RecordList.read(raw=True)``.  The
+        domain is evaluated locally, without a call to the server.
+        The operators ``child_of`` and ``parent_of``, and the paths
+        like ``'partner_id.name'`` are not supported.
+        """
+        match = _compile_domain(domain, self._fields)[1]
+        return [row for row in rows if row and match(row)]
+
+    def paginate(self, domain, limit=CHUNK_SIZE, context=None):
+        """Iterate over the records of the search `domain`, by pages.
+
+        Yield a :class:`RecordList` of at most `limit` records for each
+        page.  The records are ordered by ``id``, and each page is searched
+        with the term ``('id', '>', last_id)`` instead of an `offset`.
+        The server does not need to skip the previous records, hence each
+        page is as fast as the first one.  The argument `domain` is not
+        modified.
+        """
+        if context is None:
+            context = self.client.context
+        domain = Domain(domain).to_list()
+        last_id = 0
+        while True:
+            page = self.browse(domain + [('id', '>', last_id)], limit=limit,
+                               order='id', context=context)
+            if page.id:
+                yield page
+            if len(page) < limit:
+                return
+            last_id = page.id[-1]
+
+    def iterate(self, domain, fields=None, batch=CHUNK_SIZE, order=None,
+                context=None):
+        """Iterate over the records which match the search `domain`.
+
+        The records are searched by pages of `batch` records.  The ids
+        of the next page are searched when the previous page is consumed,
+        hence the memory use does not depend on the number of records.
+        If `order` is None, the records are ordered by ``id`` and the
+        pages are searched with :meth:`paginate`.  Otherwise, the
+        `offset` and `limit` of the search are used.
+        If `fields` is None, yield a :class:`Record` for each record.
+        Otherwise, the pages are read and the values are yielded, like the
+        :meth:`Client.read` method.
+        """
+        if context is None:
+            context = self.client.context
+        if order is None:
+            for page in self.paginate(domain, batch, context=context):
+                if fields is not None:
+                    page = self.read(page.id, fields, order=True,
+                                     context=context)
+                for item in page:
+                    yield item
+            return
+        offset = 0
+        while True:
+            if fields is None:
+                page = self.browse(domain, offset=offset, limit=batch,
+                                   order=order, context=context)
+            else:
+                page = self.read(domain, fields, offset=offset, limit=batch,
+                                 order=order, context=context)
+            for item in page:
+                yield item
+            if len(page) < batch:
+                return
+            offset += batch
+
     def create(self, values, context=None):
         """Create a :class:`Record`.
 
@@ -1118,8 +2170,144 @@ class Model(object):
             context = self.client.context
         values = self._unbrowse_values(values)
         new_id = self._execute('create', values, context=context)
+        if isinstance(new_id, Future):
+            return new_id.then(lambda id_: Record(self, id_, context=context))
         return Record(self, new_id, context=context)
 
+    def create_multi(self, values_list, chunk=500, context=None):
+        """Create multiple records and return a :class:`RecordList`.
+
+        The argument `values_list` is a list of dictionaries, like the
+        `values` of :meth:`create`.  The records are created by chunks
+        of `chunk` records.  With Odoo 12.0 and newer, a single ``create``
+        call creates a chunk.  With older versions, the ``create`` calls of
+        a chunk are sent together in a :meth:`Client.batch`.
+
+        Inside a :meth:`Client.batch` block, the calls are queued in this
+        batch, and the return value is a :class:`Future` of the
+        :class:`RecordList`.
+        """
+        if context is None:
+            context = self.client.context
+        values_list = [self._unbrowse_values(values) for values in values_list]
+        create_list = float(self.client.major_version) >= 12.0
+        in_batch = self.client._batch is not None
+        results = []
+        for idx in range(0, len(values_list), chunk):
+            values_chunk = values_list[idx:idx + chunk]
+            if create_list:
+                results.append(self._execute('create', values_chunk,
+                                             context=context))
+            elif in_batch:
+                results.extend([self._execute('create', values,
+                                              context=context)
+                                for values in values_chunk])
+            else:
+                with self.client.batch():
+                    results.extend([self._execute('create', values,
+                                                  context=context)
+                                    for values in values_chunk])
+
+        def to_records(__=None):
+            ids = []
+            for res in results:
+                if isinstance(res, Future):
+                    res = res.result()
+                ids.extend(res if isinstance(res, list) else [res])
+            return RecordList(self, ids, context=context)
+        if not in_batch:
+            return to_records()
+        if results:
+            # The futures are resolved in order: the last one comes last
+            return results[-1].then(to_records)
+        future = Future(to_records)
+        future._resolve(None)
+        return future
+
+    def write_many(self, values_by_id, chunk=CHUNK_SIZE, parallel=None,
+                   context=None):
+        """Write different values on multiple records.
+
+        The argument `values_by_id` is a dictionary ``{id: values}``.
+        The ids which receive the same values are written together, with
+        a ``write`` call for each chunk of `chunk` ids.  With the argument
+        `parallel`, these calls are sent concurrently on `parallel`
+        connections, and the pool of connections is enlarged if needed.
+        They are sent one after the other if the transport is not a
+        :class:`PooledTransport`.
+        """
+        if context is None:
+            context = self.client.context
+        groups = {}
+        for (res_id, values) in sorted(values_by_id.items()):
+            values = self._unbrowse_values(values)
+            key = repr(sorted(values.items()))
+            groups.setdefault(key, (values, []))[1].append(res_id)
+        calls = []
+        for (values, ids) in sorted(groups.values(), key=lambda g: g[1]):
+            for idx in range(0, len(ids), chunk):
+                calls.append((ids[idx:idx + chunk], values))
+
+        def write(args):
+            return self._execute('write', *args, context=context)
+        if parallel and parallel > 1 and self.client._batch is None and \
+                self.client._grow_pool(min(parallel, len(calls))):
+            _map_threaded(write, calls, parallel)
+        else:
+            for args in calls:
+                write(args)
+        self._refresh_records(values_by_id)
+        return True
+
+    def _get_codec(self):
+        """Build the functions which wrap and unwrap the values.
+
+        Return a tuple of two dictionaries ``(decoders, encoders)``.
+        The decoders wrap the relational values read from the server,
+        and the encoders unwrap the values to send to the server.
+        The related models are resolved once.
+        """
+        (decoders, encoders) = ({}, {})
+        for (key, field) in self._fields.items():
+            field_type = field['type']
+            if field_type == 'many2one':
+                rel_model = self.client.model(field['relation'], False)
+                decoders[key] = _many2one_decoder(rel_model)
+            elif field_type in ('one2many', 'many2many'):
+                rel_model = self.client.model(field['relation'], False)
+                decoders[key] = _x2many_decoder(rel_model)
+                encoders[key] = _encode_x2many
+                continue
+            elif field_type == 'reference':
+                decoders[key] = _reference_decoder(self.client)
+                encoders[key] = _encode_reference
+                continue
+            encoders[key] = _encode_id
+        decoders.pop('id', None)
+        return (decoders, encoders)
+
+    def _get_dependents(self):
+        """Map each field to the fields which depend on it.
+
+        Return None if the server does not provide the ``depends``.
+        """
+        if not any('depends' in field for field in self._fields.values()):
+            return None
+        direct = {}
+        for (key, field) in self._fields.items():
+            for path in field.get('depends') or ():
+                direct.setdefault(path.split('.')[0], set()).add(key)
+        dependents = {}
+        for key in direct:
+            (found, todo) = (set(), list(direct[key]))
+            while todo:
+                name = todo.pop()
+                if name not in found:
+                    found.add(name)
+                    todo.extend(direct.get(name, ()))
+            dependents[key] = found
+        return dependents
+
     def _browse_values(self, values, context=None):
         """Wrap the values of a Record.
 
@@ -1128,40 +2316,70 @@ class Model(object):
         the value is wrapped in a Record or a RecordList.
         Return a dictionary with the same keys as the `values` argument.
         """
+        decoders = self._codec[0]
         for (key, value) in values.items():
-            if key == 'id' or hasattr(value, 'id'):
-                continue
-            field = self._fields[key]
-            field_type = field['type']
-            if field_type == 'many2one':
-                if value:
-                    rel_model = self.client.model(field['relation'], False)
-                    values[key] = Record(rel_model, value, context=context)
-            elif field_type in ('one2many', 'many2many'):
-                rel_model = self.client.model(field['relation'], False)
-                values[key] = RecordList(rel_model, value, context=context)
-            elif value and field_type == 'reference':
-                (res_model, res_id) = value.split(',')
-                rel_model = self.client.model(res_model, False)
-                values[key] = Record(rel_model, int(res_id), context=context)
+            decode = decoders.get(key)
+            if decode is not None and not hasattr(value, 'id'):
+                values[key] = decode(value, context)
         return values
 
     def _unbrowse_values(self, values):
         """Unwrap the id of Record and RecordList."""
-        new_values = values.copy()
-        for (key, value) in values.items():
-            field_type = self._fields[key]['type']
-            if hasattr(value, 'id'):
-                if field_type == 'reference':
-                    new_values[key] = '%s,%s' % (value._model_name, value.id)
-                else:
-                    new_values[key] = value = value.id
-            if field_type in ('one2many', 'many2many'):
-                if not value:
-                    new_values[key] = [(6, 0, [])]
-                elif isinstance(value[0], int_types):
-                    new_values[key] = [(6, 0, value)]
-        return new_values
+        if not values:
+            return {}
+        encoders = self._codec[1]
+        return dict([(key, encoders[key](value))
+                     for (key, value) in values.items()])
+
+    def _discard_prefetch(self, ids):
+        """Discard the values of the `ids` from all the prefetch groups."""
+        for group in list(self._prefetch_groups.values()):
+            for res_id in ids:
+                group.discard(res_id)
+
+    def _refresh_records(self, ids, exclude=None):
+        """Refresh the records of the identity map, in all contexts.
+
+        Discard their values from the prefetch groups too.  The record
+        `exclude` is not refreshed.
+        """
+        ids = set(ids)
+        self._discard_prefetch(ids)
+        records = self.client._records
+        if records:
+            # Look up the keys, instead of scanning the identity map
+            contexts = self.client._record_contexts.get(self._name, ())
+            for context in contexts:
+                for res_id in ids:
+                    record = records.get((self._name, res_id, context))
+                    if record is not None and record is not exclude:
+                        record.refresh()
+
+    def _resolve_external_ids(self, ids=None):
+        """Retrieve the External IDs of the records.
+
+        Return a tuple of two dictionaries ``(xml_ids, res_ids)``: the
+        first maps each ``id`` to one of its External IDs, and the
+        second maps each External ID to its ``id``.  The `ids` are
+        searched by chunks of 2000.
+        """
+        search_domain = [('model', '=', self._name)]
+        if ids is None:
+            chunks = [None]
+        else:
+            ids = list(ids)
+            chunks = [ids[idx:idx + CHUNK_SIZE]
+                      for idx in range(0, len(ids), CHUNK_SIZE)] or [ids]
+        (xml_ids, res_ids) = ({}, {})
+        for chunk in chunks:
+            domain = search_domain
+            if chunk is not None:
+                domain = search_domain + [('res_id', 'in', chunk)]
+            for rec in self._imd_read(domain, ['module', 'name', 'res_id']):
+                xml_id = '%(module)s.%(name)s' % rec
+                xml_ids[rec['res_id']] = xml_id
+                res_ids[xml_id] = rec['res_id']
+        return (xml_ids, res_ids)
 
     def _get_external_ids(self, ids=None):
         """Retrieve the External IDs of the records.
@@ -1169,18 +2387,17 @@ class Model(object):
         Return a dictionary with keys being the fully qualified
         External IDs, and values the ``Record`` entries.
         """
-        search_domain = [('model', '=', self._name)]
-        if ids is not None:
-            search_domain.append(('res_id', 'in', ids))
-        existing = self._imd_read(search_domain, ['module', 'name', 'res_id'])
-        res = {}
-        for rec in existing:
-            res['%(module)s.%(name)s' % rec] = self.get(rec['res_id'])
-        return res
+        res_ids = self._resolve_external_ids(ids)[1]
+        return dict([(xml_id, Record(self, res_id))
+                     for (xml_id, res_id) in res_ids.items()])
 
     def __getattr__(self, attr):
-        if attr in ('_keys', '_fields'):
+        if attr in ('_codec', '_dependents'):
             return _memoize(self, attr, getattr(self, '_get' + attr)())
+        if attr in ('_keys', '_fields', '_all_fields'):
+            value = self.client._schema_get(self._name, attr,
+                                            getattr(self, '_get' + attr))
+            return _memoize(self, attr, value)
         if attr.startswith('_imd_'):
             imd = self.client.model('ir.model.data')
             return _memoize(self, attr, getattr(imd, attr[5:]))
@@ -1191,10 +2408,114 @@ class Model(object):
             """Wrapper for client.execute(%r, %r, *params, **kwargs)."""
             if 'context' not in kwargs:
                 kwargs['context'] = self.client.context
-            return self._execute(attr, *params, **kwargs)
+            rv = self._execute(attr, *params, **kwargs)
+            if attr in ('write', 'unlink') and params:
+                ids = params[0]
+                self._refresh_records(ids if isinstance(ids, list) else [ids])
+            return rv
         return _memoize(self, attr, wrapper, (self._name, attr))
 
 
+def _many2one_decoder(rel_model):
+    def decode(value, context):
+        return value and Record(rel_model, value, context=context)
+    return decode
+
+
+def _x2many_decoder(rel_model):
+    def decode(value, context):
+        return RecordList(rel_model, value, context=context)
+    return decode
+
+
+def _reference_decoder(client):
+    def decode(value, context):
+        if not value:
+            return value
+        (res_model, res_id) = value.split(',')
+        rel_model = client.model(res_model, False)
+        return Record(rel_model, int(res_id), context=context)
+    return decode
+
+
+def _encode_id(value):
+    return value.id if hasattr(value, 'id') else value
+
+
+def _encode_reference(value):
+    if hasattr(value, 'id'):
+        return '%s,%s' % (value._model_name, value.id)
+    return value
+
+
+def _encode_x2many(value):
+    if hasattr(value, 'id'):
+        value = value.id
+    if not value:
+        return [(6, 0, [])]
+    if isinstance(value[0], int_types):
+        return [(6, 0, value)]
+    return value
+
+
+class _Prefetch(object):
+    """Read a field for the records of a :class:`RecordList` together.
+
+    The records returned by the ``RecordList`` share this object.  When
+    a field of one of them is accessed, the field is read for the block of
+    ``CHUNK_SIZE`` records around it in a single call.  The values are
+    discarded when the records are written or unlinked through the same
+    :class:`Model`.
+    """
+
+    def __init__(self, records):
+        records._model._prefetch_groups[id(self)] = self
+        self._model = records._model
+        self._ids = records._ids
+        self._context = records._context
+        self._values = {}
+        (self._rows, self._row_fields) = ({}, set())
+
+    def get(self, res_id, attr):
+        values = self._values.setdefault(attr, {})
+        if res_id not in values:
+            # The blocks are aligned, for the reverse iteration too
+            start = self._ids.index(res_id) // CHUNK_SIZE * CHUNK_SIZE
+            ids = [id_ for id_ in self._ids[start:start + CHUNK_SIZE]
+                   if id_ and id_ not in values]
+            rows = self._model.read(ids, attr, order=True,
+                                    context=self._context)
+            values.update(zip(ids, rows))
+        return values[res_id]
+
+    def rows(self, fields):
+        """Return the raw values of the `fields`, by id.
+
+        The fields which are not read yet are read for all the records,
+        in chunks of `CHUNK_SIZE` records.
+        """
+        if not self._rows:
+            self._rows = dict([(id_, {'id': id_}) for id_ in self._ids
+                               if id_])
+            self._row_fields = set(['id'])
+        missing = [name for name in fields if name not in self._row_fields]
+        if missing and self._rows:
+            for row in self._model.client.read(
+                    self._model._name, sorted(self._rows), missing,
+                    context=self._context, chunk_size=CHUNK_SIZE):
+                self._rows[row['id']].update(row)
+        self._row_fields.update(missing)
+        return self._rows
+
+    def discard(self, res_id=None):
+        """Forget the values of `res_id`, or all the values."""
+        if res_id is None:
+            self._values.clear()
+        for values in self._values.values():
+            values.pop(res_id, None)
+        (self._rows, self._row_fields) = ({}, set())
+
+
 class RecordList(object):
     """A sequence of Odoo :class:`Record`.
 
@@ -1204,62 +2525,93 @@ class RecordList(object):
     ``one2many`` and ``many2many`` attributes are wrapped in ``RecordList``
     and list of ``RecordList`` objects.  Use the method ``RecordList.write``
     to assign a single value to all the selected records.
+    When an attribute of one of its records is accessed, this attribute
+    is read for the following records too, in the same call.
     """
 
     def __init__(self, res_model, ids, context=None):
-        idnames = list(ids)
-        for (index, id_) in enumerate(ids):
-            if isinstance(id_, (list, tuple)):
-                ids[index] = id_ = id_[0]
-            assert isinstance(id_, int_types), repr(id_)
+        names = None
+        if not isinstance(ids, array):
+            ids = list(ids)
+            if any(isinstance(id_, (list, tuple)) for id_ in ids):
+                # Keep the names only if they are provided
+                names = ids
+                ids = [id_[0] if isinstance(id_, (list, tuple)) else id_
+                       for id_ in names]
+            for id_ in ids:
+                assert isinstance(id_, int_types), repr(id_)
         if context is None:
             context = res_model.client.context
         # Bypass the __setattr__ method
         self.__dict__.update({
-            'id': ids,
+            '_ids': array(_ID_TYPECODE, ids),
+            '_names': names,
             '_model_name': res_model._name,
             '_model': res_model,
-            '_idnames': idnames,
             '_context': context,
             '_execute': res_model._execute,
+            '_prefetch': None,
         })
 
+    def _get_prefetch(self):
+        """Return the :class:`_Prefetch` of the records, created lazily."""
+        if self._prefetch is None:
+            self.__dict__['_prefetch'] = _Prefetch(self)
+        return self._prefetch
+
+    @property
+    def id(self):
+        """The list of ids."""
+        ids = self._ids.tolist()
+        if 0 in self._ids:
+            ids = [id_ or False for id_ in ids]
+        return ids
+
+    @property
+    def _idnames(self):
+        return self.id if self._names is None else self._names
+
     def __repr__(self):
-        if len(self.id) > 16:
-            ids = 'length=%d' % len(self.id)
+        if len(self._ids) > 16:
+            ids = 'length=%d' % len(self._ids)
         else:
             ids = self.id
         return "<RecordList '%s,%s'>" % (self._model_name, ids)
 
     def __dir__(self):
-        return ['__getitem__', 'read', 'write', 'unlink', '_context',
-                '_idnames', '_model', '_model_name',
+        return ['__getitem__', 'read', 'read_chunks', 'filtered', 'write',
+                'unlink',
+                '_context', '_idnames', '_model', '_model_name',
                 '_external_id'] + self._model._keys
 
     def __len__(self):
-        return len(self.id)
+        return len(self._ids)
 
     def __add__(self, other):
         assert self._model is other._model, 'Model mismatch'
         ids = self._idnames + other._idnames
         return RecordList(self._model, ids, self._context)
 
-    def read(self, fields=None, context=None):
+    def read(self, fields=None, context=None, chunk_size=None,
+             parallel=None, raw=False):
         """Wrapper for :meth:`Record.read` method."""
         if context is None:
             context = self._context
 
         client = self._model.client
-        if self.id:
-            values = client.read(self._model_name, self.id,
-                                 fields, order=True, context=context)
+        if self._ids:
+            values = client.read(self._model_name, self.id, fields,
+                                 order=True, context=context,
+                                 chunk_size=chunk_size, parallel=parallel)
+            if raw:
+                return values
             if is_list_of_dict(values):
                 browse_values = self._model._browse_values
                 return [v and browse_values(v, context) for v in values]
         else:
             values = []
 
-        if isinstance(fields, basestring):
+        if isinstance(fields, basestring) and not raw:
             field = self._model._fields.get(fields)
             if field:
                 if field['type'] == 'many2one':
@@ -1279,23 +2631,52 @@ class RecordList(object):
                     return records
         return values
 
+    def read_chunks(self, fields=None, chunk_size=CHUNK_SIZE, context=None,
+                    raw=False):
+        """Read the records in chunks, and yield a list for each chunk.
+
+        See :meth:`RecordList.read` and :meth:`Client.read_chunks`.
+        """
+        for idx in range(0, len(self._ids), chunk_size):
+            yield self[idx:idx + chunk_size].read(fields, context=context,
+                                                  raw=raw)
+
+    def filtered(self, domain):
+        """Return the records which match the search `domain`.
+
+        The domain is evaluated locally, see :meth:`Model.filter_local`.
+        The fields of the domain are read once for all the records, and
+        they are kept for the next calls.  The order of the records is
+        preserved.
+        """
+        (names, match) = _compile_domain(domain, self._model._fields)
+        rows = self._get_prefetch().rows(names)
+        ids = [id_ for id_ in self._ids if id_ and match(rows[id_])]
+        return RecordList(self._model, ids, context=self._context)
+
     def write(self, values, context=None):
         """Wrapper for :meth:`Record.write` method."""
-        if not self.id:
+        if not self._ids:
             return True
         if context is None:
             context = self._context
+        ids = self.id
         values = self._model._unbrowse_values(values)
-        rv = self._execute('write', self.id, values, context=context)
+        rv = self._execute('write', ids, values, context=context)
+        if self._prefetch is not None:
+            self._prefetch.discard()
+        self._model._refresh_records(ids)
         return rv
 
     def unlink(self, context=None):
         """Wrapper for :meth:`Record.unlink` method."""
-        if not self.id:
+        if not self._ids:
             return True
         if context is None:
             context = self._context
-        rv = self._execute('unlink', self.id, context=context)
+        ids = self.id
+        rv = self._execute('unlink', ids, context=context)
+        self._model._refresh_records(ids)
         return rv
 
     @property
@@ -1306,16 +2687,24 @@ class RecordList(object):
         False if there's none.  If multiple IDs exist for a record,
         only one of them is returned (randomly).
         """
-        xml_ids = dict([(r.id, xml_id) for (xml_id, r) in
-                        self._model._get_external_ids(self.id).items()])
-        return [xml_ids.get(res_id, False) for res_id in self.id]
+        ids = self.id
+        xml_ids = self._model._resolve_external_ids(ids)[0]
+        return [xml_ids.get(res_id, False) for res_id in ids]
 
     def __getitem__(self, key):
-        idname = self._idnames[key]
+        if self._names is not None:
+            idname = self._names[key]
+        elif isinstance(key, slice):
+            idname = self._ids[key]
+        else:
+            idname = self._ids[key] or False
         if idname is False:
             return False
-        cls = RecordList if isinstance(key, slice) else Record
-        return cls(self._model, idname, context=self._context)
+        if isinstance(key, slice):
+            return RecordList(self._model, idname, context=self._context)
+        record = Record(self._model, idname, context=self._context)
+        object.__setattr__(record, '_prefetch', self._get_prefetch())
+        return record
 
     def __getattr__(self, attr):
         context = self._context
@@ -1341,7 +2730,7 @@ class RecordList(object):
 
     def __eq__(self, other):
         return (isinstance(other, RecordList) and
-                self.id == other.id and self._model is other._model)
+                self._ids == other._ids and self._model is other._model)
 
 
 class Record(object):
@@ -1356,22 +2745,43 @@ class Record(object):
     The attributes are evaluated lazily, and they are cached in the record.
     The Record's cache is invalidated if any attribute is changed.
     """
+    def __new__(cls, res_model, res_id, context=None):
+        records = res_model.client._records
+        if records is None:
+            return object.__new__(cls)
+        if context is None:
+            context = res_model.client.context
+        key = (res_model._name,
+               res_id[0] if isinstance(res_id, (list, tuple)) else res_id,
+               repr(context))
+        record = records.get(key)
+        if record is None:
+            records[key] = record = object.__new__(cls)
+            res_model.client._record_contexts.setdefault(
+                key[0], set()).add(key[2])
+        return record
+
+    __slots__ = ('id', '_model_name', '_model', '_context', '_execute',
+                 '_values', '_name', '_prefetch', '__weakref__')
+
     def __init__(self, res_model, res_id, context=None):
+        if hasattr(self, 'id'):
+            return      # Already in the identity map
+        setattr_ = super(Record, self).__setattr__
         if isinstance(res_id, (list, tuple)):
             (res_id, res_name) = res_id
-            self.__dict__['_name'] = res_name
+            setattr_('_name', res_name)
         assert isinstance(res_id, int_types), repr(res_id)
         if context is None:
             context = res_model.client.context
         # Bypass the __setattr__ method
-        self.__dict__.update({
-            'id': res_id,
-            '_model_name': res_model._name,
-            '_model': res_model,
-            '_context': context,
-            '_cached_keys': set(),
-            '_execute': res_model._execute,
-        })
+        setattr_('id', res_id)
+        setattr_('_model_name', res_model._name)
+        setattr_('_model', res_model)
+        setattr_('_context', context)
+        setattr_('_execute', res_model._execute)
+        setattr_('_values', {})
+        setattr_('_prefetch', None)
 
     def __repr__(self):
         return "<Record '%s,%d'>" % (self._model_name, self.id)
@@ -1391,7 +2801,8 @@ class Record(object):
             name = '%s' % (id_name[1],)
         except Exception:
             name = '%s,%d' % (self._model_name, self.id)
-        return _memoize(self, '_name', name)
+        super(Record, self).__setattr__('_name', name)
+        return name
 
     @property
     def _keys(self):
@@ -1403,15 +2814,42 @@ class Record(object):
 
     def refresh(self):
         """Force refreshing the record's data."""
-        self._cached_keys.discard('id')
-        for key in self._cached_keys:
-            delattr(self, key)
-        self._cached_keys.clear()
+        self._model._discard_prefetch([self.id])
+        self._values.clear()
+
+    def _invalidate(self, values):
+        """Update the cache after a write of the `values`.
+
+        The simple values are cached as written.  The other fields which
+        are written, and the fields which depend on them, are discarded.
+        """
+        dependents = self._model._dependents
+        if dependents is None:
+            return self.refresh()
+        self._model._discard_prefetch([self.id])
+        (cache, fields) = (self._values, self._model._fields)
+        for key in values:
+            for name in dependents.get(key, ()):
+                cache.pop(name, None)
+        for (key, value) in values.items():
+            if fields[key]['type'] in _CACHED_TYPES:
+                cache[key] = value
+            else:
+                cache.pop(key, None)
+
+    def _refresh_after(self, method):
+        """Apply the `method_refresh` policy of the client."""
+        policy = self._model.client.method_refresh
+        if isinstance(policy, dict) and method in policy:
+            self._model._discard_prefetch([self.id])
+            for key in policy[method]:
+                self._values.pop(key, None)
+        elif policy or isinstance(policy, dict):
+            self.refresh()
 
     def _update(self, values):
         new_values = self._model._browse_values(values, context=self._context)
-        self.__dict__.update(new_values)
-        self._cached_keys.update(new_values)
+        self._values.update(new_values)
         return new_values
 
     def read(self, fields=None, context=None):
@@ -1450,7 +2888,12 @@ class Record(object):
             context = self._context
         values = self._model._unbrowse_values(values)
         rv = self._execute('write', [self.id], values, context=context)
-        self.refresh()
+        self._model._refresh_records([self.id], exclude=self)
+        if isinstance(rv, Future):
+            # Queued in a batch: the values are not written yet
+            self.refresh()
+        else:
+            self._invalidate(values)
         return rv
 
     def unlink(self, context=None):
@@ -1458,6 +2901,7 @@ class Record(object):
         if context is None:
             context = self._context
         rv = self._execute('unlink', [self.id], context=context)
+        self._model._refresh_records([self.id], exclude=self)
         self.refresh()
         return rv
 
@@ -1472,13 +2916,16 @@ class Record(object):
         if default:
             default = self._model._unbrowse_values(default)
         new_id = self._execute('copy', self.id, default, context=context)
+        if isinstance(new_id, Future):
+            return new_id.then(
+                lambda id_: Record(self._model, id_, context=context))
         return Record(self._model, new_id, context=context)
 
     def _send(self, signal):
         """Trigger workflow `signal` for this :class:`Record`."""
         exec_workflow = self._model.client.exec_workflow
         rv = exec_workflow(self._model_name, signal, self.id)
-        self.refresh()
+        self._refresh_after(signal)
         return rv
 
     @property
@@ -1489,8 +2936,8 @@ class Record(object):
         with default value False if there's none.  If multiple IDs
         exist, only one of them is returned (randomly).
         """
-        xml_ids = self._model._get_external_ids([self.id])
-        return list(xml_ids)[0] if xml_ids else False
+        xml_ids = self._model._resolve_external_ids([self.id])[0]
+        return xml_ids.get(self.id, False)
 
     def _set_external_id(self, xml_id):
         """Set the External ID of this record."""
@@ -1509,8 +2956,15 @@ class Record(object):
                 '_keys', '_fields'] + self._model._keys
 
     def __getattr__(self, attr):
+        if attr in Record.__slots__ and attr != '_name':
+            raise AttributeError("'Record' object has no attribute %r" % attr)
+        if attr in self._values:
+            return self._values[attr]
         context = self._context
         if attr in self._model._keys:
+            if self._prefetch is not None:
+                value = self._prefetch.get(self.id, attr)
+                return self._update({attr: value})[attr]
             return self.read(attr, context=context)
         if attr == '_name':
             return self._get_name()
@@ -1522,11 +2976,17 @@ class Record(object):
             if context is not None and 'context' not in kwargs:
                 kwargs['context'] = context
             res = self._execute(attr, [self.id], *params, **kwargs)
-            self.refresh()
+            self._refresh_after(attr)
             if isinstance(res, list) and len(res) == 1:
                 return res[0]
             return res
-        return _memoize(self, attr, wrapper, (self._model_name, attr, self.id))
+        return _bind(self, attr, wrapper, (self._model_name, attr, self.id))
+
+    def __delattr__(self, attr):
+        # Forget the cached value
+        if attr not in self._values:
+            raise AttributeError("'Record' object has no attribute %r" % attr)
+        del self._values[attr]
 
     def __setattr__(self, attr, value):
         if attr == '_external_id':
@@ -1535,6 +2995,9 @@ class Record(object):
             raise AttributeError("'Record' object has no attribute %r" % attr)
         if attr == 'id':
             raise AttributeError("'Record' object attribute 'id' is read-only")
+        session = self._model.client._session
+        if session is not None:
+            return session.add(self, {attr: value})
         self.write({attr: value})
 
     def __eq__(self, other):
@@ -1542,6 +3005,198 @@ class Record(object):
                 self.id == other.id and self._model is other._model)
 
 
+class AsyncClient(object):
+    """An :mod:`asyncio` front-end for a connected :class:`Client`.
+
+    The methods have the same signature as their synchronous counterpart,
+    and they return an awaitable.  The RPC calls run in a pool of
+    `max_workers` threads, and they share the keep-alive connections of
+    the `client`.  The pool of connections of the :class:`PooledTransport`
+    is enlarged to `max_workers` if needed.  With another transport, a
+    single thread sends the calls one after the other.  The version
+    check and the login are not repeated.
+    Requires Python 3.4 or newer.
+
+    This is a wrapper around a pool of threads, not a non-blocking
+    transport: at most `max_workers` calls run concurrently, and the
+    other calls wait for a free worker.
+
+        aclient = AsyncClient(client)
+        (partners, users) = await asyncio.gather(
+            aclient.read('res.partner', [('active', '=', True)], 'name'),
+            aclient.model('res.users').browse([]))
+    """
+
+    def __init__(self, client, max_workers=16, loop=None):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        self.client = client
+        if not client._grow_pool(max_workers):
+            # The transport is not safe to use from multiple threads
+            max_workers = 1
+        self._asyncio = asyncio
+        self._loop = loop
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    def __repr__(self):
+        return '<AsyncClient %r>' % (self.client,)
+
+    def _run(self, func, *args, **kwargs):
+        loop = self._loop or self._asyncio.get_event_loop()
+        if kwargs:
+            func = functools.partial(func, **kwargs)
+        return loop.run_in_executor(self._executor, func, *args)
+
+    def _run_wrapped(self, func, *args, **kwargs):
+        """Like :meth:`_run`, and wrap the records of the result."""
+        def call():
+            return self._wrap(func(*args, **kwargs))
+        return self._run(call)
+
+    def _wrap(self, value):
+        """Return the :mod:`asyncio` counterpart of a record."""
+        if isinstance(value, Record):
+            return AsyncRecord(self, value)
+        if isinstance(value, RecordList):
+            return AsyncRecordList(self, value)
+        return value
+
+    def execute(self, obj, method, *params, **kwargs):
+        """Awaitable wrapper for :meth:`Client.execute`."""
+        return self._run(self.client.execute, obj, method, *params, **kwargs)
+
+    def read(self, obj, *params, **kwargs):
+        """Awaitable wrapper for :meth:`Client.read`."""
+        return self._run(self.client.read, obj, *params, **kwargs)
+
+    def model(self, name):
+        """Return an :class:`AsyncModel`, without validity check."""
+        return AsyncModel(self, self.client.model(name, False))
+
+    def close(self):
+        """Shut down the pool of threads."""
+        self._executor.shutdown(wait=False)
+
+
+class AsyncModel(object):
+    """The :mod:`asyncio` counterpart of the :class:`Model` class."""
+
+    def __init__(self, aclient, model):
+        self._aclient = aclient
+        self._model = model
+
+    def __repr__(self):
+        return "<AsyncModel '%s'>" % (self._model._name,)
+
+    def browse(self, domain, *params, **kwargs):
+        """Awaitable wrapper for :meth:`Model.browse`.
+
+        The result is an :class:`AsyncRecord` for a single id, else an
+        :class:`AsyncRecordList`.
+        """
+        return self._aclient._run_wrapped(self._model.browse, domain,
+                                          *params, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            errmsg = "'AsyncModel' object has no attribute %r" % attr
+            raise AttributeError(errmsg)
+        method = getattr(self._model, attr)
+
+        def wrapper(self, *params, **kwargs):
+            """Awaitable wrapper for Model.%s(*params, **kwargs)."""
+            return self._aclient._run_wrapped(method, *params, **kwargs)
+        return _memoize(self, attr, wrapper, attr)
+
+
+class AsyncRecord(object):
+    """The :mod:`asyncio` counterpart of the :class:`Record` class.
+
+    The wrapped :class:`Record` is the `record` attribute.  The fields
+    and the methods return an awaitable, e.g. ``await arec.name``.  The
+    related records are wrapped in :class:`AsyncRecord` and
+    :class:`AsyncRecordList`.
+    """
+
+    def __init__(self, aclient, record):
+        self._aclient = aclient
+        self.record = record
+
+    def __repr__(self):
+        return '<Async%s' % (repr(self.record)[1:],)
+
+    @property
+    def id(self):
+        return self.record.id
+
+    def read(self, fields=None, context=None):
+        """Awaitable wrapper for :meth:`Record.read`."""
+        return self._aclient._run(self.record.read, fields, context=context)
+
+    def write(self, values, context=None):
+        """Awaitable wrapper for :meth:`Record.write`."""
+        return self._aclient._run(self.record.write, values, context=context)
+
+    def unlink(self, context=None):
+        """Awaitable wrapper for :meth:`Record.unlink`."""
+        return self._aclient._run(self.record.unlink, context=context)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            errmsg = "'AsyncRecord' object has no attribute %r" % attr
+            raise AttributeError(errmsg)
+        (aclient, record) = (self._aclient, self.record)
+        if attr in record._model._keys:
+            return aclient._run_wrapped(getattr, record, attr)
+        method = getattr(record, attr)
+
+        def wrapper(*params, **kwargs):
+            return aclient._run_wrapped(method, *params, **kwargs)
+        return wrapper
+
+
+class AsyncRecordList(object):
+    """The :mod:`asyncio` counterpart of the :class:`RecordList` class.
+
+    The wrapped :class:`RecordList` is the `records` attribute.  The
+    items are :class:`AsyncRecord`, and the slices are
+    :class:`AsyncRecordList`.
+    """
+
+    def __init__(self, aclient, records):
+        self._aclient = aclient
+        self.records = records
+
+    def __repr__(self):
+        return '<Async%s' % (repr(self.records)[1:],)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, key):
+        return self._aclient._wrap(self.records[key])
+
+    def __iter__(self):
+        for idx in range(len(self.records)):
+            yield self[idx]
+
+    @property
+    def id(self):
+        return self.records.id
+
+    def read(self, fields=None, context=None):
+        """Awaitable wrapper for :meth:`RecordList.read`."""
+        return self._aclient._run(self.records.read, fields, context=context)
+
+    def write(self, values, context=None):
+        """Awaitable wrapper for :meth:`RecordList.write`."""
+        return self._aclient._run(self.records.write, values, context=context)
+
+    def unlink(self, context=None):
+        """Awaitable wrapper for :meth:`RecordList.unlink`."""
+        return self._aclient._run(self.records.unlink, context=context)
+
+
 def _interact(global_vars, use_pprint=True, usage=USAGE):
     import code
     import pprint
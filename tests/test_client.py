@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
+import errno
+import json
+import socket
+
 import mock
 from mock import call, sentinel, ANY
 
@@ -97,17 +101,141 @@ class TestService(XmlRpcTestCase):
         self.test_service_openerp_client(server_version='7.0')
 
 
+class TestPooledTransport(XmlRpcTestCase):
+    """Test the PooledTransport class."""
+
+    def _patch_service(self):
+        def new_conn(*args, **kwargs):
+            conn = mock.Mock(name='conn')
+            conn.getresponse.return_value.status = 200
+            return conn
+        conn_class = mock.patch('erppeek.httplib.HTTPConnection').start()
+        conn_class.side_effect = new_conn
+        mock.patch('erppeek.PooledTransport.parse_response',
+                   return_value=(sentinel.RESULT,)).start()
+        return conn_class
+
+    def test_reuse(self):
+        transport = erppeek.PooledTransport(pool_size=1)
+        req = transport.request
+
+        self.assertEqual(req('host:8069', '/xmlrpc/db', b'x'),
+                         (sentinel.RESULT,))
+        self.assertEqual(req('host:8069', '/xmlrpc/object', b'y'),
+                         (sentinel.RESULT,))
+        self.assertEqual(self.service.call_count, 1)
+        (conn,) = [conn for (conn, t) in transport._idle['host:8069']]
+        self.assertEqual(conn.putrequest.mock_calls,
+                         [call('POST', '/xmlrpc/db'),
+                          call('POST', '/xmlrpc/object')])
+        conn.putheader.assert_any_call('Content-Length', '1')
+        conn.endheaders.assert_called_with(b'y')
+
+        transport.close()
+        self.assertEqual(transport._idle, {})
+        conn.close.assert_called_once_with()
+        self.assertOutput('')
+
+    def test_idle_timeout(self):
+        transport = erppeek.PooledTransport(idle_timeout=0)
+
+        transport.request('host:8069', '/xmlrpc/db', b'x')
+        transport.request('host:8069', '/xmlrpc/db', b'x')
+        self.assertEqual(self.service.call_count, 2)
+        self.assertEqual(len(transport._idle['host:8069']), 1)
+        self.assertOutput('')
+
+    def test_reconnect(self):
+        transport = erppeek.PooledTransport()
+        transport.request('host:8069', '/xmlrpc/db', b'x')
+        (conn,) = [conn for (conn, t) in transport._idle['host:8069']]
+        conn.getresponse.side_effect = socket.error(errno.EPIPE, 'Broken')
+
+        self.assertEqual(transport.request('host:8069', '/xmlrpc/db', b'x'),
+                         (sentinel.RESULT,))
+        self.assertEqual(self.service.call_count, 2)
+        conn.close.assert_called_once_with()
+        self.assertNotIn(conn, [c for (c, t) in transport._idle['host:8069']])
+
+        # A fresh connection is not retried
+        self.service.side_effect = None
+        self.service.return_value = mock.Mock()
+        self.service.return_value.getresponse.side_effect = \
+            socket.error(errno.EPIPE, 'Broken')
+        transport.close()
+        self.assertRaises(socket.error, transport.request,
+                          'host:8069', '/xmlrpc/db', b'x')
+        self.assertEqual(self.service.call_count, 3)
+        self.assertOutput('')
+
+
+class TestJsonRpcTransport(XmlRpcTestCase):
+    """Test the JsonRpcTransport class."""
+
+    def _patch_service(self):
+        self.conn = conn = mock.Mock(name='conn')
+        conn.getresponse.return_value.status = 200
+        return mock.patch('erppeek.httplib.HTTPConnection',
+                          return_value=conn).start()
+
+    def test_service(self):
+        transport = erppeek.JsonRpcTransport()
+        svc = erppeek.Service('http://127.0.0.1:8069/odoo', 'object',
+                              ['execute'], transport=transport)
+        self.assertIn('/jsonrpc/object', str(svc))
+        self.conn.getresponse.return_value.read.return_value = \
+            b'{"jsonrpc": "2.0", "id": 1, "result": [1, 2]}'
+
+        self.assertEqual(svc.execute('db', 1, 'pw', 'res.users', 'search',
+                                     [('id', '>', 0)]), [1, 2])
+        self.service.assert_called_once_with('127.0.0.1:8069')
+        self.conn.putrequest.assert_called_once_with('POST', '/odoo/jsonrpc')
+        self.conn.putheader.assert_any_call('Content-Type', 'application/json')
+        (body,) = self.conn.endheaders.call_args[0]
+        self.assertEqual(json.loads(body.decode('utf-8')), {
+            'jsonrpc': '2.0', 'method': 'call', 'id': 1,
+            'params': {'service': 'object', 'method': 'execute',
+                       'args': ['db', 1, 'pw', 'res.users', 'search',
+                                [['id', '>', 0]]]}})
+        self.assertOutput('')
+
+    def test_error(self):
+        transport = erppeek.JsonRpcTransport()
+        svc = erppeek.Service('http://127.0.0.1:8069', 'db',
+                              ['list'], transport=transport)
+        self.conn.getresponse.return_value.read.side_effect = [
+            b'{"jsonrpc": "2.0", "id": 1, "error": {"code": 200, '
+            b'"message": "Odoo Server Error", "data": {"name": "KeyError", '
+            b'"debug": "Traceback...", "message": "bad key"}}}',
+            b'{"jsonrpc": "2.0", "id": 2, "error": {"code": 200, '
+            b'"message": "Odoo Server Error", "data": {'
+            b'"name": "odoo.exceptions.UserError", "debug": "Traceback...", '
+            b'"message": "Not allowed"}}}']
+
+        with self.assertRaises(erppeek.Fault) as cm:
+            svc.list()
+        self.assertEqual(cm.exception.faultCode, 'bad key')
+        self.assertEqual(cm.exception.faultString, 'Traceback...')
+        with self.assertRaises(erppeek.Fault) as cm:
+            svc.list()
+        self.assertEqual(cm.exception.faultCode, 'warning -- Not allowed')
+
+        # The connection is still usable
+        self.assertEqual(self.service.call_count, 1)
+        self.assertOutput('')
+
+
 class TestCreateClient(XmlRpcTestCase):
     """Test the Client class."""
     server_version = '6.1'
     startup_calls = (
-        call(ANY, 'db', ANY, None, verbose=ANY),
+        call(ANY, 'db', ANY, ANY, verbose=ANY),
         'db.server_version',
-        call(ANY, 'db', ANY, None, verbose=ANY),
-        call(ANY, 'common', ANY, None, verbose=ANY),
-        call(ANY, 'object', ANY, None, verbose=ANY),
-        call(ANY, 'report', ANY, None, verbose=ANY),
-        call(ANY, 'wizard', ANY, None, verbose=ANY),
+        call(ANY, 'db', ANY, ANY, verbose=ANY),
+        call(ANY, 'common', ANY, ANY, verbose=ANY),
+        call(ANY, 'object', ANY, ANY, verbose=ANY),
+        call(ANY, 'report', ANY, ANY, verbose=ANY),
+        call(ANY, 'wizard', ANY, ANY, verbose=ANY),
         'db.list',
     )
 
@@ -125,6 +253,48 @@ class TestCreateClient(XmlRpcTestCase):
             {('http://127.0.0.1:8069', 'newdb', 'usr'): (1, 'pss')})
         self.assertOutput('')
 
+    def test_create_shared_transport(self):
+        self.service.db.list.return_value = ['newdb']
+        self.service.common.login.return_value = 1
+
+        client = erppeek.Client('http://127.0.0.1:8069', 'newdb', 'usr', 'pss')
+        transports = set([args[3] for (name, args, kwargs)
+                          in self.service.mock_calls if name == ''])
+        self.assertEqual(transports, set([client._transport]))
+        self.assertIsInstance(client._transport, erppeek.PooledTransport)
+        self.assertFalse(client._transport.secure)
+
+        client = erppeek.Client('https://127.0.0.1:8069')
+        self.assertTrue(client._transport.secure)
+
+        transport = erppeek.Transport()
+        client = erppeek.Client('http://127.0.0.1:8069', transport=transport)
+        self.assertIs(client._transport, transport)
+
+        # The idle connections are closed on exit
+        conn = mock.Mock()
+        with erppeek.Client('http://127.0.0.1:8069') as client:
+            client._transport._idle['127.0.0.1:8069'] = [(conn, 0)]
+        conn.close.assert_called_once_with()
+        self.assertEqual(client._transport._idle, {})
+        self.assertOutput('')
+
+    def test_create_jsonrpc(self):
+        client = erppeek.Client('jsonrpc+https://127.0.0.1:8069')
+        self.assertIsInstance(client._transport, erppeek.JsonRpcTransport)
+        self.assertTrue(client._transport.secure)
+        self.assertEqual(client._server, 'https://127.0.0.1:8069')
+        self.assertEqual(self.service.mock_calls[0],
+                         call('https://127.0.0.1:8069', 'db', ANY,
+                              client._transport, verbose=False))
+        self.service.reset_mock()
+
+        self.assertRaises(erppeek.Error, erppeek.Client,
+                          'jsonrpc+http://127.0.0.1:8069',
+                          transport=erppeek.PooledTransport())
+        self.assertCalls()
+        self.assertOutput('')
+
     def test_create_getpass(self):
         getpass = mock.patch('getpass.getpass',
                              return_value='password').start()
@@ -511,6 +681,94 @@ class TestClientApi(XmlRpcTestCase):
         )
         self.assertOutput('')
 
+    def test_read_chunks(self):
+        read = self.client.read
+        self.service.object.execute.side_effect = self.obj_exec
+
+        self.assertEqual(read('foo.bar', [13, 17, 42], chunk_size=2),
+                         [IdentDict(17), IdentDict(13), IdentDict(42)])
+        self.assertEqual(read('foo.bar', [42, 17, 13], 'city', order=True,
+                              chunk_size=2),
+                         ['v_city_42', 'v_city_17', 'v_city_13'])
+        self.assertEqual(read('foo.bar', [13, 17], chunk_size=2),
+                         [IdentDict(17), IdentDict(13)])
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [13, 17], None),
+            OBJ('foo.bar', 'read', [42], None),
+            OBJ('foo.bar', 'read', [13, 17], ['city']),
+            OBJ('foo.bar', 'read', [42], ['city']),
+            OBJ('foo.bar', 'read', [13, 17], None),
+        )
+
+        chunks = self.client.read_chunks('foo.bar', [13, 17, 42], 'city',
+                                         chunk_size=2)
+        self.assertCalls()
+        self.assertEqual(next(chunks), ['v_city_17', 'v_city_13'])
+        self.assertCalls(OBJ('foo.bar', 'read', [13, 17], ['city']))
+        self.assertEqual(list(chunks), [['v_city_42']])
+        self.assertCalls(OBJ('foo.bar', 'read', [42], ['city']))
+
+        chunks = self.client.read_chunks('foo.bar', ['name like Morice'],
+                                         chunk_size=1, limit=2)
+        self.assertEqual(list(chunks), [[DIC2], [DIC1]])
+        self.assertEqual(list(self.client.read_chunks('foo.bar', False)), [])
+        domain = [('name', 'like', 'Morice')]
+        self.assertCalls(
+            OBJ('foo.bar', 'search', domain, 0, 2, None, None),
+            OBJ('foo.bar', 'read', [ID2], None),
+            OBJ('foo.bar', 'read', [ID1], None),
+        )
+        self.assertOutput('')
+
+    def test_read_parallel(self):
+        read = self.client.read
+        self.service.object.execute.side_effect = self.obj_exec
+        ids = [42, 13, 17, 99, 7]
+
+        def assertCallsUnordered(*expected_calls):
+            # The calls are sent concurrently, in any order
+            auth = (self.database, self.uid, self.password)
+            expected_calls = [call.object.execute(*(auth + args))
+                              for args in expected_calls]
+            self.assertEqual(sorted(self.service.mock_calls, key=str),
+                             sorted(expected_calls, key=str))
+            self.service.reset_mock()
+
+        self.assertEqual(read('foo.bar', ids, 'city', order=True,
+                              parallel=3),
+                         ['v_city_%s' % id_ for id_ in ids])
+        assertCallsUnordered(
+            ('foo.bar', 'read', [7, 13], ['city']),
+            ('foo.bar', 'read', [17, 42], ['city']),
+            ('foo.bar', 'read', [99], ['city']),
+        )
+
+        self.assertEqual(read('foo.bar', ids, parallel=2, chunk_size=4),
+                         [IdentDict(id_) for id_ in [42, 17, 13, 7, 99]])
+        self.assertEqual(read('foo.bar', [42], parallel=2), [IdentDict(42)])
+        assertCallsUnordered(
+            ('foo.bar', 'read', [7, 13, 17, 42], None),
+            ('foo.bar', 'read', [99], None),
+            ('foo.bar', 'read', [42], None),
+        )
+
+        # The pool keeps a connection for each thread
+        self.assertEqual(self.client._transport.pool_size, 4)
+        read('foo.bar', ids, 'city', parallel=8)
+        self.assertEqual(self.client._transport.pool_size, 5)
+        self.service.reset_mock()
+
+        # The other transports are not shared between threads
+        self.client._transport = erppeek.Transport()
+        with mock.patch('erppeek._map_threaded') as map_threaded:
+            read('foo.bar', [42, 13, 17], 'city', parallel=2)
+        self.assertFalse(map_threaded.called)
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [13, 17], ['city']),
+            OBJ('foo.bar', 'read', [42], ['city']),
+        )
+        self.assertOutput('')
+
     def test_read_invalid(self):
         read = self.client.read
         self.service.object.execute.side_effect = self.obj_exec
@@ -564,6 +822,75 @@ class TestClientApi(XmlRpcTestCase):
 
         self.test_method('perm_read', single_id=False)
 
+    def test_batch(self):
+        self.service.object.execute.side_effect = self.obj_exec
+        self.service.object._dispatch.side_effect = erppeek.Fault('Err', '')
+
+        with self.client.batch():
+            written = self.client.write('foo.bar', [42], {'name': 'x'})
+            unlinked = self.client.unlink('foo.bar', [13])
+            self.assertEqual(self.client.search('foo.bar', []), [ID2, ID1])
+            self.assertEqual(
+                self.client.execute('foo.bar', 'read_group', [], ['name'],
+                                    ['name']), sentinel.OTHER)
+            self.assertIsInstance(written, erppeek.Future)
+            self.assertFalse(written.done())
+            self.assertRaises(erppeek.Error, written.result)
+            self.assertCalls(
+                OBJ('foo.bar', 'search', []),
+                OBJ('foo.bar', 'read_group', [], ['name'], ['name']),
+            )
+
+        self.assertTrue(written.done())
+        self.assertEqual(written.result(), sentinel.OTHER)
+        self.assertEqual(unlinked.result(), sentinel.OTHER)
+        self.assertCalls(
+            call.object._dispatch('system.multicall', ([
+                {'methodName': 'execute',
+                 'params': ('database', 1, 'passwd',
+                            'foo.bar', 'write', [42], {'name': 'x'})},
+                {'methodName': 'execute',
+                 'params': ('database', 1, 'passwd',
+                            'foo.bar', 'unlink', [13])}],)),
+            OBJ('foo.bar', 'write', [42], {'name': 'x'}),
+            OBJ('foo.bar', 'unlink', [13]),
+        )
+
+        # Multicall is not retried
+        with self.client.batch():
+            written = self.client.write('foo.bar', [42], {'name': 'y'})
+        self.assertEqual(written.result(), sentinel.OTHER)
+        self.assertCalls(OBJ('foo.bar', 'write', [42], {'name': 'y'}))
+
+        # Nothing is sent if the block fails
+        with self.assertRaises(ZeroDivisionError):
+            with self.client.batch():
+                unlinked = self.client.unlink('foo.bar', [13])
+                1 / 0
+        self.assertCalls()
+        self.assertTrue(unlinked.done())
+        with self.assertRaises(erppeek.Error) as cm:
+            unlinked.result()
+        self.assertEqual(str(cm.exception), 'Batch aborted')
+        self.assertIsNone(self.client._batch)
+        self.assertOutput('')
+
+    def test_batch_multicall(self):
+        self.service.object._dispatch.return_value = [
+            [True], {'faultCode': 'warning -- Oops', 'faultString': 'TB'}]
+
+        with self.client.batch() as batch:
+            written = self.client.write('foo.bar', [42], {'name': 'x'})
+            copied = self.client.copy('foo.bar', 42)
+            self.assertRaises(erppeek.Error, self.client.batch().__enter__)
+        self.assertEqual(batch.calls, [])
+
+        self.assertIs(written.result(), True)
+        self.assertRaises(erppeek.Fault, copied.result)
+        self.assertEqual(len(self.service.mock_calls), 1)
+        self.service.reset_mock()
+        self.assertOutput('')
+
     def test_model(self):
         self.service.object.execute.side_effect = self.obj_exec
 
@@ -811,3 +1138,58 @@ class TestClientApi50(TestClientApi):
 
         self.assertIn('to process', self.stdout.popvalue())
         self.assertOutput('')
+
+
+class TestClientApi80(XmlRpcTestCase):
+    """Test the Client API for Odoo 8."""
+    server_version = '8.0'
+    server = 'http://127.0.0.1:8069'
+    database = 'database'
+    user = 'user'
+    password = 'passwd'
+    uid = 1
+
+    def obj_exec(self, *args):
+        if args[4] == 'search_read':
+            return [IdentDict(ID2), IdentDict(ID1)]
+        if args[4] == 'read':
+            return [IdentDict(res_id) for res_id in args[5][::-1]]
+        return sentinel.OTHER
+
+    def test_read_search_read(self):
+        read = self.client.read
+        self.service.object.execute.side_effect = self.obj_exec
+
+        searchterm = 'name like Morice'
+        self.assertEqual(read('foo.bar', [searchterm]), [DIC2, DIC1])
+        self.assertEqual(read('foo.bar', [searchterm], order='name ASC'),
+                         [DIC2, DIC1])
+        self.assertEqual(read('foo.bar', [searchterm], 'city', limit=2),
+                         ['v_city_4002', 'v_city_4001'])
+        read('foo.bar', [searchterm], offset=80, fields=['birthdate', 'city'])
+        read('foo.bar', [searchterm], context={'lang': 'fr_FR'})
+        rv = read('foo.bar', [searchterm], '%(birthdate)s %(city)s')
+        self.assertEqual(rv, ['v_birthdate_4002 v_city_4002',
+                              'v_birthdate_4001 v_city_4001'])
+
+        domain = [('name', 'like', 'Morice')]
+        self.assertCalls(
+            OBJ('foo.bar', 'search_read', domain, None, 0, None, None),
+            OBJ('foo.bar', 'search_read', domain, None, 0, None, 'name ASC'),
+            OBJ('foo.bar', 'search_read', domain, ['city'], 0, 2, None),
+            OBJ('foo.bar', 'search_read', domain, ['birthdate', 'city'],
+                80, None, None),
+            OBJ('foo.bar', 'search_read', domain, None, 0, None, None,
+                {'lang': 'fr_FR'}),
+            OBJ('foo.bar', 'search_read', domain, ['birthdate', 'city'],
+                0, None, None),
+        )
+
+        # Lists of ids still use 'read'
+        self.assertEqual(read('foo.bar', [ID1, ID2], order=True), [DIC1, DIC2])
+        self.assertEqual(read('foo.bar', ID1, 'city'), 'v_city_4001')
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [ID1, ID2], None),
+            OBJ('foo.bar', 'read', [ID1], ['city']),
+        )
+        self.assertOutput('')
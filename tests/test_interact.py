@@ -11,13 +11,13 @@ from ._common import XmlRpcTestCase
 class TestInteract(XmlRpcTestCase):
     server_version = '6.1'
     startup_calls = (
-        call(ANY, 'db', ANY, None, verbose=ANY),
+        call(ANY, 'db', ANY, ANY, verbose=ANY),
         'db.server_version',
-        call(ANY, 'db', ANY, None, verbose=ANY),
-        call(ANY, 'common', ANY, None, verbose=ANY),
-        call(ANY, 'object', ANY, None, verbose=ANY),
-        call(ANY, 'report', ANY, None, verbose=ANY),
-        call(ANY, 'wizard', ANY, None, verbose=ANY),
+        call(ANY, 'db', ANY, ANY, verbose=ANY),
+        call(ANY, 'common', ANY, ANY, verbose=ANY),
+        call(ANY, 'object', ANY, ANY, verbose=ANY),
+        call(ANY, 'report', ANY, ANY, verbose=ANY),
+        call(ANY, 'wizard', ANY, ANY, verbose=ANY),
         'db.list',
     )
 
@@ -1,10 +1,21 @@
 # -*- coding: utf-8 -*-
+import gc
+import os
+import shutil
+import tempfile
+
+import mock
 from mock import sentinel, ANY
+import unittest2
 
 import erppeek
 from ._common import XmlRpcTestCase, OBJ, callable
 
 PY2 = ('' == ''.encode())
+try:
+    import asyncio
+except ImportError:     # Python 2
+    asyncio = None
 
 
 class TestCase(XmlRpcTestCase):
@@ -426,6 +437,95 @@ class TestModel(TestCase):
 
         self.assertOutput('')
 
+    def test_iterate(self):
+        FooBar = self.model('foo.bar')
+        all_ids = [1001, 1002, 1003, 1004, 1005]
+
+        def obj_exec(*args):
+            if args[4] == 'search':
+                (domain, offset, limit) = args[5:8]
+                ids = all_ids
+                if domain and domain[-1][:2] == ('id', '>'):
+                    ids = [id_ for id_ in ids if id_ > domain[-1][2]]
+                return ids[offset:offset + limit]
+            return self.obj_exec(*args)
+        self.service.object.execute.side_effect = obj_exec
+
+        records = FooBar.iterate(['name like Morice'], batch=2,
+                                 order='name')
+        self.assertCalls()
+        self.assertEqual([rec.id for rec in records], all_ids)
+
+        values = list(FooBar.iterate([], 'name', batch=5, order='name'))
+        self.assertEqual(values, ['v_name'] * 5)
+
+        domain = [('name', 'like', 'Morice')]
+        self.assertCalls(
+            OBJ('foo.bar', 'search', domain, 0, 2, 'name', None),
+            OBJ('foo.bar', 'search', domain, 2, 2, 'name', None),
+            OBJ('foo.bar', 'search', domain, 4, 2, 'name', None),
+            OBJ('foo.bar', 'search', [], 0, 5, 'name', None),
+            OBJ('foo.bar', 'read', all_ids, ['name']),
+            OBJ('foo.bar', 'search', [], 5, 5, 'name', None),
+        )
+
+        # Without order, use the keyset pagination
+        records = FooBar.iterate(['name like Morice'], batch=3)
+        self.assertEqual([rec.id for rec in records], all_ids)
+        values = list(FooBar.iterate([], 'name', batch=3))
+        self.assertEqual(values, ['v_name'] * 5)
+
+        self.assertCalls(
+            OBJ('foo.bar', 'search', domain + [('id', '>', 0)],
+                0, 3, 'id', None),
+            OBJ('foo.bar', 'search', domain + [('id', '>', 1003)],
+                0, 3, 'id', None),
+            OBJ('foo.bar', 'search', [('id', '>', 0)], 0, 3, 'id', None),
+            OBJ('foo.bar', 'read', [1001, 1002, 1003], ['name']),
+            OBJ('foo.bar', 'search', [('id', '>', 1003)], 0, 3, 'id', None),
+            OBJ('foo.bar', 'read', [1004, 1005], ['name']),
+        )
+        self.assertOutput('')
+
+    def test_paginate(self):
+        FooBar = self.model('foo.bar')
+        all_ids = [1001, 1002, 1003, 1004]
+
+        def obj_exec(*args):
+            if args[4] == 'search':
+                (domain, offset, limit) = args[5:8]
+                ids = [id_ for id_ in all_ids
+                       if all(id_ > term[2] for term in domain
+                              if term[:2] == ('id', '>'))]
+                return ids[offset:offset + limit]
+            return self.obj_exec(*args)
+        self.service.object.execute.side_effect = obj_exec
+
+        domain = ['name like Morice']
+        pages = FooBar.paginate(domain, limit=2)
+        self.assertCalls()
+        pages = list(pages)
+        self.assertEqual([page.id for page in pages],
+                         [[1001, 1002], [1003, 1004]])
+        self.assertIsInstance(pages[0], erppeek.RecordList)
+        # The domain is not modified
+        self.assertEqual(domain, ['name like Morice'])
+
+        self.assertEqual(list(FooBar.paginate([('id', '>', 2000)])), [])
+
+        domain = [('name', 'like', 'Morice')]
+        self.assertCalls(
+            OBJ('foo.bar', 'search', domain + [('id', '>', 0)],
+                0, 2, 'id', None),
+            OBJ('foo.bar', 'search', domain + [('id', '>', 1002)],
+                0, 2, 'id', None),
+            OBJ('foo.bar', 'search', domain + [('id', '>', 1004)],
+                0, 2, 'id', None),
+            OBJ('foo.bar', 'search', [('id', '>', 2000), ('id', '>', 0)],
+                0, 2000, 'id', None),
+        )
+        self.assertOutput('')
+
     def test_create(self):
         FooBar = self.model('foo.bar')
 
@@ -447,6 +547,118 @@ class TestModel(TestCase):
         )
         self.assertOutput('')
 
+    def test_create_batch(self):
+        self.service.object._dispatch.side_effect = erppeek.Fault('Err', '')
+        FooBar = self.model('foo.bar')
+
+        with self.client.batch():
+            record = FooBar.create({'spam': 42})
+            self.assertIsInstance(record, erppeek.Future)
+            self.assertCalls(OBJ('foo.bar', 'fields_get'))
+
+        self.assertIsInstance(record.result(), erppeek.Record)
+        self.assertEqual(record.result().id, 1999)
+        self.assertCalls(
+            ANY,
+            OBJ('foo.bar', 'create', {'spam': 42}),
+        )
+        self.assertOutput('')
+
+    def test_create_multi(self):
+        self.service.object._dispatch.side_effect = erppeek.Fault('Err', '')
+        FooBar = self.model('foo.bar')
+        rec = FooBar.browse(42)
+        values_list = [{'spam': 42}, {'spam': rec}, {'misc_id': rec}]
+
+        records = FooBar.create_multi(values_list, chunk=2)
+        self.assertIsInstance(records, erppeek.RecordList)
+        self.assertEqual(records.id, [1999, 1999, 1999])
+        self.assertCalls(
+            OBJ('foo.bar', 'fields_get'),
+            ANY,
+            OBJ('foo.bar', 'create', {'spam': 42}),
+            OBJ('foo.bar', 'create', {'spam': 42}),
+            OBJ('foo.bar', 'create', {'misc_id': 42}),
+        )
+        self.assertEqual(FooBar.create_multi([]), FooBar.browse([1])[:0])
+
+        # Odoo >= 12 creates a list of records
+        self.client.major_version = '12.0'
+        self.service.object.execute.side_effect = [[2001, 2002], [2003]]
+        records = FooBar.create_multi(values_list, chunk=2)
+        self.assertEqual(records.id, [2001, 2002, 2003])
+        self.assertCalls(
+            OBJ('foo.bar', 'create', [{'spam': 42}, {'spam': 42}]),
+            OBJ('foo.bar', 'create', [{'misc_id': 42}]),
+        )
+
+        # Inside a batch, return a Future
+        self.service.object.execute.side_effect = [[2001, 2002], [2003]]
+        with self.client.batch():
+            future = FooBar.create_multi(values_list, chunk=2)
+            empty = FooBar.create_multi([])
+            self.assertFalse(future.done())
+            self.assertCalls()
+        self.assertEqual(future.result().id, [2001, 2002, 2003])
+        self.assertEqual(empty.result().id, [])
+        self.assertCalls(
+            OBJ('foo.bar', 'create', [{'spam': 42}, {'spam': 42}]),
+            OBJ('foo.bar', 'create', [{'misc_id': 42}]),
+        )
+
+        self.client.major_version = '6.1'
+        self.service.object.execute.side_effect = self.obj_exec
+        with self.client.batch():
+            future = FooBar.create_multi(values_list, chunk=2)
+        self.assertEqual(future.result().id, [1999, 1999, 1999])
+        self.assertCalls(
+            OBJ('foo.bar', 'create', {'spam': 42}),
+            OBJ('foo.bar', 'create', {'spam': 42}),
+            OBJ('foo.bar', 'create', {'misc_id': 42}),
+        )
+        self.assertOutput('')
+
+    def test_write_many(self):
+        FooBar = self.model('foo.bar')
+        rec = FooBar.browse(42)
+
+        self.assertTrue(FooBar.write_many({
+            13: {'spam': 42},
+            17: {'spam': rec},
+            21: {'misc_id': rec},
+            42: {'spam': 42},
+            51: {'spam': 'ham'},
+        }, chunk=2))
+        self.assertCalls(
+            OBJ('foo.bar', 'fields_get'),
+            OBJ('foo.bar', 'write', [13, 17], {'spam': 42}),
+            OBJ('foo.bar', 'write', [42], {'spam': 42}),
+            OBJ('foo.bar', 'write', [21], {'misc_id': 42}),
+            OBJ('foo.bar', 'write', [51], {'spam': 'ham'}),
+        )
+
+        FooBar.write_many({13: {'spam': 1}, 17: {'spam': 2}}, parallel=2)
+        self.assertEqual(
+            sorted(args[5:] for (__, args, __) in self.service.mock_calls),
+            [([13], {'spam': 1}), ([17], {'spam': 2})])
+        self.service.reset_mock()
+
+        values_by_id = dict([(res_id, {'spam': res_id}) for res_id in range(9)])
+        FooBar.write_many(values_by_id, parallel=6)
+        self.assertEqual(self.client._transport.pool_size, 6)
+        self.service.reset_mock()
+
+        # The other transports are not shared between threads
+        self.client._transport = erppeek.Transport()
+        with mock.patch('erppeek._map_threaded') as map_threaded:
+            FooBar.write_many({13: {'spam': 1}, 17: {'spam': 2}}, parallel=2)
+        self.assertFalse(map_threaded.called)
+        self.assertCalls(
+            OBJ('foo.bar', 'write', [13], {'spam': 1}),
+            OBJ('foo.bar', 'write', [17], {'spam': 2}),
+        )
+        self.assertOutput('')
+
     def test_create_relation(self):
         FooBar = self.model('foo.bar')
 
@@ -519,6 +731,218 @@ class TestModel(TestCase):
 
         self.test_method('perm_read', single_id=False)
 
+    @unittest2.skipIf(asyncio is None, 'asyncio is not available')
+    def test_async(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        aclient = erppeek.AsyncClient(self.client, max_workers=2, loop=loop)
+        self.addCleanup(aclient.close)
+        self.assertEqual(self.client._transport.pool_size, 4)
+        self.addCleanup(erppeek.AsyncClient(self.client, 8).close)
+        self.assertEqual(self.client._transport.pool_size, 8)
+        with mock.patch.object(self.client, '_transport', erppeek.Transport()):
+            serial = erppeek.AsyncClient(self.client, 8)
+        self.addCleanup(serial.close)
+        self.assertEqual(serial._executor._max_workers, 1)
+        FooBar = aclient.model('foo.bar')
+
+        (records, record, name) = loop.run_until_complete(asyncio.gather(
+            FooBar.browse(['name like Morice']),
+            FooBar.browse(42),
+            aclient.read('foo.bar', 42, 'name')))
+        self.assertIsInstance(records, erppeek.AsyncRecordList)
+        self.assertEqual(records.id, [1001, 1002])
+        self.assertEqual(len(records), 2)
+        self.assertIsInstance(record, erppeek.AsyncRecord)
+        self.assertEqual(record.id, 42)
+        self.assertEqual(name, 'v_name')
+
+        (names, count) = loop.run_until_complete(asyncio.gather(
+            records.read('name'), FooBar.count(['name like Morice'])))
+        self.assertEqual(names, ['v_name', 'v_name'])
+        self.assertEqual(count, [sentinel.OTHER])
+        loop.run_until_complete(records.write({'spam': 42}))
+
+        # The records of an AsyncRecordList are AsyncRecord
+        self.assertEqual([rec.id for rec in records], [1001, 1002])
+        self.assertIsInstance(records[0], erppeek.AsyncRecord)
+        self.assertIsInstance(records[1:], erppeek.AsyncRecordList)
+        (message, rec42) = loop.run_until_complete(asyncio.gather(
+            records[1].message, FooBar.get(42)))
+        self.assertEqual(message, 'v_message')
+        self.assertIsInstance(rec42, erppeek.AsyncRecord)
+        loop.run_until_complete(record.write({'spam': 13}))
+
+        domain = [('name', 'like', 'Morice')]
+        calls = self.service.mock_calls
+        for expected in [('foo.bar', 'search', domain),
+                         ('foo.bar', 'read', [42], ['name']),
+                         ('foo.bar', 'read', [1001, 1002], ['name']),
+                         ('foo.bar', 'search_count', domain),
+                         ('foo.bar', 'write', [1001, 1002], {'spam': 42}),
+                         ('foo.bar', 'read', [1001, 1002], ['message']),
+                         ('foo.bar', 'write', [42], {'spam': 13})]:
+            self.assertIn(
+                ('object.execute', ('database', 1, 'passwd') + expected, {}),
+                calls)
+        self.service.reset_mock()
+        self.assertOutput('')
+
+    def test_schema_cache(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        version = ['8.0.1.0']
+
+        def obj_exec(*args):
+            if args[3:5] == ('ir.module.module', 'read'):
+                return [{'id': 1, 'name': 'base',
+                         'latest_version': version[0]}]
+            if args[4] == 'fields_get':
+                return {'name': {'type': 'char', 'string': 'Name'}}
+            return self.obj_exec(*args)
+        self.service.object.execute.side_effect = obj_exec
+
+        def model():
+            client = erppeek.Client(self.server, self.database, self.user,
+                                    self.password, schema_cache=tmpdir)
+            self.service.reset_mock()
+            FooBar = client.model('foo.bar', False)
+            self.assertEqual(FooBar.keys(),
+                             ['id', 'message', 'misc_id', 'name'])
+            self.assertEqual(FooBar.field('name')['string'], 'Name')
+            return FooBar
+        installed = [('state', '=', 'installed')]
+        read_modules = (
+            OBJ('ir.module.module', 'search', installed),
+            OBJ('ir.module.module', 'read', [1001, 1002],
+                ['name', 'latest_version']),
+        )
+
+        model()
+        self.assertCalls(*(read_modules + (
+            OBJ('foo.bar', 'fields_get_keys'),
+            OBJ('foo.bar', 'fields_get'),
+        )))
+        self.assertEqual(len(os.listdir(tmpdir)), 1)
+
+        # Warm start
+        FooBar = model()
+        self.assertCalls(*read_modules)
+
+        # Invalidated when the modules change
+        version[0] = '8.0.1.1'
+        model()
+        self.assertCalls(*(read_modules + (
+            OBJ('foo.bar', 'fields_get_keys'),
+            OBJ('foo.bar', 'fields_get'),
+        )))
+
+        # Another file for another user, whatever the language
+        client = FooBar.client
+        client.context = {'lang': 'fr_FR'}
+        client.login('guest', self.password)
+        self.service.reset_mock()
+        self.assertEqual(client._schema_get('foo.bar', 'keys', list), [])
+        self.assertCalls(*read_modules)
+        self.assertEqual(len(os.listdir(tmpdir)), 2)
+        client._schema_clear()
+        client.login(self.user, self.password)
+        self.assertEqual(len(os.listdir(tmpdir)), 1)
+
+        FooBar.client._schema_clear()
+        self.assertEqual(os.listdir(tmpdir), [])
+        self.assertOutput('')
+
+    def test_xml_id_index(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        rows = {
+            5: {'id': 5, 'name': 'xml_name', 'model': 'foo.bar',
+                'res_id': 42, 'write_date': '2016-01-04 10:00:00'},
+            6: {'id': 6, 'name': 'other', 'model': 'foo.bar',
+                'res_id': 43, 'write_date': '2016-01-05 10:00:00'},
+        }
+        found = [[5]]
+
+        def obj_exec(*args):
+            if args[3:5] == ('ir.model.data', 'search'):
+                return found.pop(0) if found else []
+            if args[3:5] == ('ir.model.data', 'read'):
+                return [rows[res_id] for res_id in args[5]]
+            return self.obj_exec(*args)
+        self.service.object.execute.side_effect = obj_exec
+
+        def model():
+            client = erppeek.Client(self.server, self.database, self.user,
+                                    self.password, schema_cache=tmpdir,
+                                    xml_id_index=True)
+            self.service.reset_mock()
+            return client.model('foo.bar', False)
+        fields = ['name', 'model', 'res_id', 'write_date']
+        since_5 = ['|', ('id', '>', 5),
+                   ('write_date', '>=', '2016-01-04 10:00:00')]
+        since_6 = ['|', ('id', '>', 6),
+                   ('write_date', '>=', '2016-01-05 10:00:00')]
+
+        FooBar = model()
+        self.assertEqual(FooBar.get('this_module.xml_name').id, 42)
+        self.assertEqual(FooBar.get('this_module.xml_name').id, 42)
+        self.assertCalls(
+            OBJ('ir.model.data', 'search',
+                [('module', '=', 'this_module'), ('id', '>', 0)]),
+            OBJ('ir.model.data', 'read', [5], fields),
+        )
+
+        # On a miss, the new entries are retrieved
+        found.append([6])
+        self.assertEqual(FooBar.get('this_module.other').id, 43)
+        self.assertIsNone(FooBar.get('this_module.missing'))
+        self.assertEqual(FooBar.get_many(['this_module.other']).id, [43])
+        self.assertCalls(
+            OBJ('ir.model.data', 'search',
+                [('module', '=', 'this_module')] + since_5),
+            OBJ('ir.model.data', 'read', [6], fields),
+            OBJ('ir.model.data', 'search',
+                [('module', '=', 'this_module')] + since_6),
+        )
+        self.assertEqual(len(os.listdir(tmpdir)), 1)
+
+        # Warm start
+        FooBar = model()
+        self.assertEqual(FooBar.get('this_module.other').id, 43)
+        self.assertEqual(FooBar.get('this_module.xml_name').id, 42)
+        self.assertCalls(
+            OBJ('ir.model.data', 'search',
+                [('module', '=', 'this_module')] + since_6),
+        )
+
+        FooBar.client._xml_ids_clear()
+        self.assertEqual(os.listdir(tmpdir), [])
+        self.assertOutput('')
+
+    def test_codec(self):
+        FooBar = self.model('foo.bar')
+
+        (decoders, encoders) = FooBar._codec
+        self.assertEqual(sorted(decoders),
+                         ['line_ids', 'many_ids', 'misc_id'])
+        self.assertIn('name', encoders)
+        self.assertIs(FooBar._codec, FooBar._codec)
+        self.assertCalls(OBJ('foo.bar', 'fields_get'))
+
+        values = FooBar._browse_values({
+            'id': 1, 'name': 'N', 'misc_id': [421, 'Misc'],
+            'line_ids': [1, 2], 'many_ids': []})
+        self.assertEqual(values['misc_id'],
+                         self.model('foo.misc', False).browse(421))
+        self.assertIsInstance(values['line_ids'], erppeek.RecordList)
+        self.assertEqual(FooBar._unbrowse_values(values), {
+            'id': 1, 'name': 'N', 'misc_id': 421,
+            'line_ids': [(6, 0, [1, 2])], 'many_ids': [(6, 0, [])]})
+        self.assertRaises(KeyError, FooBar._unbrowse_values, {'bad': 1})
+        self.assertCalls()
+        self.assertOutput('')
+
     def test_get_external_ids(self):
         FooBar = self.model('foo.bar')
 
@@ -534,6 +958,160 @@ class TestModel(TestCase):
         )
         self.assertOutput('')
 
+    def test_get_many(self):
+        FooBar = self.model('foo.bar')
+
+        records = FooBar.get_many(['this_module.xml_name', 'other.missing',
+                                   'this_module.xml_name'])
+        self.assertIsInstance(records, erppeek.RecordList)
+        self.assertEqual(records.id, [42, False, 42])
+        self.assertEqual(FooBar.get_many([]).id, [])
+        self.assertCalls(
+            OBJ('ir.model.data', 'search', [
+                ('model', '=', 'foo.bar'), '|',
+                '&', ('module', '=', 'other'), ('name', 'in', ['missing']),
+                '&', ('module', '=', 'this_module'),
+                ('name', 'in', ['xml_name'])]),
+            OBJ('ir.model.data', 'read', sentinel.FOO,
+                ['module', 'name', 'res_id']),
+        )
+        self.assertOutput('')
+
+    def test_filter_local(self):
+        FooBar = self.model('foo.bar')
+        rows = [
+            {'id': 1, 'name': 'Morice', 'spam': 3,
+             'misc_id': [421, 'Misc 421'], 'line_ids': [7, 8]},
+            {'id': 2, 'name': 'Blinky', 'spam': False,
+             'misc_id': False, 'line_ids': []},
+            {'id': 3, 'name': 'Clyde', 'spam': 12,
+             'misc_id': [422, 'Other'], 'line_ids': [8]},
+        ]
+
+        def filter_ids(domain):
+            return [row['id'] for row in FooBar.filter_local(rows, domain)]
+
+        self.assertEqual(filter_ids([]), [1, 2, 3])
+        self.assertEqual(filter_ids(['name = Morice']), [1])
+        self.assertEqual(filter_ids(['name != Morice']), [2, 3])
+        self.assertEqual(filter_ids(['spam > 2']), [1, 3])
+        self.assertEqual(filter_ids(['spam < 5']), [1])
+        self.assertEqual(filter_ids(['spam = False']), [2])
+        self.assertEqual(filter_ids(['spam =? None']), [1, 2, 3])
+        self.assertEqual(filter_ids(['spam =? 12']), [3])
+        self.assertEqual(filter_ids(['spam in (3, 12)']), [1, 3])
+        self.assertEqual(filter_ids(['name ilike L']), [2, 3])
+        self.assertEqual(filter_ids(['name like L']), [])
+        self.assertEqual(filter_ids(['name not like o']), [2, 3])
+        self.assertEqual(filter_ids(['name =like %y']), [2])
+        self.assertEqual(filter_ids(['name =ilike c_yde']), [3])
+        self.assertEqual(filter_ids([(1, '=', 1)]), [1, 2, 3])
+
+        # Relational fields
+        self.assertEqual(filter_ids(['misc_id = 421']), [1])
+        self.assertEqual(filter_ids(['misc_id != 421']), [2, 3])
+        self.assertEqual(filter_ids(['misc_id = False']), [2])
+        self.assertEqual(filter_ids(['misc_id in [421, 422]']), [1, 3])
+        self.assertEqual(filter_ids(['misc_id ilike other']), [3])
+        self.assertEqual(filter_ids(['line_ids = 8']), [1, 3])
+        self.assertEqual(filter_ids(['line_ids = False']), [2])
+        self.assertEqual(filter_ids(['line_ids != False']), [1, 3])
+        self.assertEqual(filter_ids(['line_ids not in [7]']), [2, 3])
+
+        # Prefix operators
+        self.assertEqual(filter_ids(['!', 'name = Morice']), [2, 3])
+        self.assertEqual(filter_ids(['|', 'name = Morice', 'spam > 10']),
+                         [1, 3])
+        self.assertEqual(filter_ids(['spam > 2', 'name != Morice']), [3])
+        self.assertEqual(filter_ids(['|', '!', 'spam > 2',
+                                     '&', 'name = Clyde', 'spam = 12']),
+                         [2, 3])
+
+        self.assertRaises(ValueError, filter_ids, ['misc_id child_of 421'])
+        self.assertRaises(ValueError, filter_ids, ['misc_id.name = Other'])
+        self.assertRaises(ValueError, filter_ids, ['line_ids like x'])
+        self.assertRaises(ValueError, filter_ids, ['|', 'name = Morice'])
+        self.assertCalls(OBJ('foo.bar', 'fields_get'))
+        self.assertOutput('')
+
+
+class TestModel80(TestCase):
+    """Tests the Model class with Odoo 8."""
+    server_version = '8.0'
+
+    def obj_exec(self, *args):
+        if args[4] == 'search_read':
+            return [{'model': 'foo.bar', 'id': 371}]
+        return super(TestModel80, self).obj_exec(*args)
+
+    def test_fields(self):
+        self.service.object.execute_kw.return_value = {
+            'misc_id': {'type': 'many2one', 'relation': 'foo.misc'},
+            'name': {'type': 'char'},
+            'message': {'type': 'text'},
+            'spam': {'type': 'char'},
+        }
+        FooBar = self.model('foo.bar')
+        rec = FooBar.browse(42)
+
+        self.assertIsInstance(rec.read()['misc_id'], erppeek.Record)
+        self.assertEqual(rec.misc_id.id, 421)
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [42], None),
+            ('object.execute_kw', sentinel.AUTH, 'foo.bar', 'fields_get',
+             [], {'attributes': ['type', 'relation', 'depends']}),
+        )
+
+        # The full definition is read on demand
+        self.assertEqual(FooBar.field('name')['type'], sentinel.FIELD_TYPE)
+        self.assertIn('birthdate', FooBar.fields())
+        self.assertEqual(sorted(FooBar.fields('name city')),
+                         ['city', 'name'])
+        self.assertCalls(OBJ('foo.bar', 'fields_get'))
+        self.assertOutput('')
+
+    def test_write_cache(self):
+        self.service.object.execute_kw.return_value = {
+            'misc_id': {'type': 'many2one', 'relation': 'foo.misc',
+                        'depends': []},
+            'name': {'type': 'char', 'depends': []},
+            'message': {'type': 'text', 'depends': ['misc_id.name']},
+        }
+        rec = self.model('foo.bar').browse(42)
+        self.assertEqual(rec.name, 'v_name')
+        self.assertEqual(rec.message, 'v_message')
+        self.assertCalls(
+            OBJ('foo.bar', 'fields_get_keys'),
+            OBJ('foo.bar', 'read', [42], ['name']),
+            ('object.execute_kw', sentinel.AUTH, 'foo.bar', 'fields_get',
+             [], {'attributes': ['type', 'relation', 'depends']}),
+            OBJ('foo.bar', 'read', [42], ['message']),
+        )
+
+        # The written value is cached, the other fields are kept
+        rec.name = 'Morice'
+        self.assertEqual(rec.name, 'Morice')
+        self.assertEqual(rec.message, 'v_message')
+        self.assertCalls(OBJ('foo.bar', 'write', [42], {'name': 'Morice'}))
+
+        # The dependent fields are discarded
+        rec.misc_id = 7
+        self.assertEqual(rec.name, 'Morice')
+        self.assertEqual(rec.message, 'v_message')
+        self.assertCalls(
+            OBJ('foo.bar', 'write', [42], {'misc_id': 7}),
+            OBJ('foo.bar', 'read', [42], ['message']),
+        )
+
+        # Inside a batch, the values are not written yet
+        self.service.object._dispatch.return_value = [[True]]
+        with self.client.batch():
+            rec.name = 'Jones'
+            self.assertEqual(rec._values, {})
+        self.assertEqual(len(self.service.mock_calls), 1)
+        self.service.reset_mock()
+        self.assertOutput('')
+
 
 class TestRecord(TestCase):
     """Tests the Model class and methods."""
@@ -590,6 +1168,132 @@ class TestRecord(TestCase):
         )
         self.assertOutput('')
 
+    def test_filtered(self):
+        records = self.model('foo.bar').browse([13, 17, 42, 13, False])
+
+        def obj_exec(*args):
+            if args[4] == 'read':
+                return [dict([('id', res_id)] + [
+                    (name, 'N%d' % res_id if name == 'name' else res_id)
+                    for name in args[6]]) for res_id in args[5]]
+            return self.obj_exec(*args)
+        self.service.object.execute.side_effect = obj_exec
+
+        matches = records.filtered(['name in ["N13", "N42"]'])
+        self.assertIsInstance(matches, erppeek.RecordList)
+        self.assertEqual(matches.id, [13, 42, 13])
+        self.assertEqual(records.filtered(['name = N17']).id, [17])
+        self.assertEqual(records.filtered(['|', 'id = 42', 'spam < 15']).id,
+                         [13, 42, 13])
+        self.assertEqual(records.filtered([]).id, [13, 17, 42, 13])
+        self.assertCalls(
+            OBJ('foo.bar', 'fields_get'),
+            OBJ('foo.bar', 'read', [13, 17, 42], ['name']),
+            OBJ('foo.bar', 'read', [13, 17, 42], ['spam']),
+        )
+
+        # The values are read again after a write
+        records.write({'message': 'spam'})
+        self.assertEqual(records.filtered(['name = N17']).id, [17])
+        self.assertCalls(
+            OBJ('foo.bar', 'write', [13, 17, 42, 13, False],
+                {'message': 'spam'}),
+            OBJ('foo.bar', 'read', [13, 17, 42], ['name']),
+        )
+
+        # The ids are read in chunks
+        with mock.patch('erppeek.CHUNK_SIZE', 2):
+            self.assertEqual(records.filtered(['spam > 15']).id, [17, 42])
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [13, 17], ['spam']),
+            OBJ('foo.bar', 'read', [42], ['spam']),
+        )
+        self.assertOutput('')
+
+    def test_method_refresh(self):
+        rec = self.model('foo.bar').browse(42)
+        rec._update({'name': 'v_name', 'message': 'v_message'})
+
+        # By default, the cache is discarded
+        rec.action_done()
+        self.assertEqual(rec._values, {})
+
+        rec._update({'name': 'v_name', 'message': 'v_message'})
+        self.client.method_refresh = {'action_done': ['message']}
+        rec.action_done()
+        self.assertEqual(rec._values, {'name': 'v_name'})
+        rec.action_other()
+        self.assertEqual(rec._values, {})
+
+        rec._update({'name': 'v_name'})
+        self.client.method_refresh = False
+        rec.action_done()
+        self.assertEqual(rec._values, {'name': 'v_name'})
+        self.assertCalls(
+            OBJ('foo.bar', 'fields_get'),
+            OBJ('foo.bar', 'fields_get_keys'),
+            OBJ('foo.bar', 'action_done', [42]),
+            OBJ('foo.bar', 'action_done', [42]),
+            OBJ('foo.bar', 'action_other', [42]),
+            OBJ('foo.bar', 'action_done', [42]),
+        )
+        self.assertOutput('')
+
+    def test_session(self):
+        records = self.model('foo.bar').browse([13, 17])
+        rec = self.model('foo.bar').browse(42)
+
+        with self.client.session():
+            rec.message = 'one'
+            rec.name = 42
+            records[0].name = 42
+            records[1].message = 'zero'
+            records[1].message = 'two'
+            self.assertCalls(OBJ('foo.bar', 'fields_get_keys'))
+        self.assertCalls(
+            OBJ('foo.bar', 'fields_get'),
+            OBJ('foo.bar', 'write', [13], {'name': 42}),
+            OBJ('foo.bar', 'write', [17], {'message': 'two'}),
+            OBJ('foo.bar', 'write', [42], {'message': 'one', 'name': 42}),
+        )
+
+        # The pending values are written before the next call
+        with self.client.session():
+            rec.name = 1
+            self.assertEqual(rec.message, 'v_message')
+            self.assertCalls(
+                OBJ('foo.bar', 'write', [42], {'name': 1}),
+                OBJ('foo.bar', 'read', [42], ['message']),
+            )
+            rec.message = 'three'
+            self.assertEqual(rec.message, 'v_message')
+            self.assertRaises(erppeek.Error, self.client.session().__enter__)
+        self.assertCalls(
+            OBJ('foo.bar', 'write', [42], {'message': 'three'}),
+            OBJ('foo.bar', 'read', [42], ['message']),
+        )
+
+        # The record of a RecordList does not return the prefetched value
+        rec13 = records[0]
+        self.assertEqual(rec13.message, 'v_message')
+        with self.client.session():
+            rec13.message = 'NEW'
+            self.assertEqual(rec13.message, 'v_message')
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [13, 17], ['message']),
+            OBJ('foo.bar', 'write', [13], {'message': 'NEW'}),
+            OBJ('foo.bar', 'read', [13], ['message']),
+        )
+
+        # The pending values are discarded on error
+        with self.assertRaises(ZeroDivisionError):
+            with self.client.session():
+                rec.name = 2
+                1 / 0
+        self.assertIsNone(self.client._session)
+        self.assertCalls()
+        self.assertOutput('')
+
     def test_write_relation(self):
         records = self.model('foo.bar').browse([13, 17])
         rec = self.model('foo.bar').browse(42)
@@ -797,7 +1501,9 @@ class TestRecord(TestCase):
         self.assertRaises(AttributeError, setattr, records, 'missingattr', 42)
 
         # method can be forgotten (any use case?)
-        del rec.missingattr, records.missingattr
+        del records.missingattr
+        # the methods of a Record are not memoized
+        self.assertRaises(AttributeError, delattr, rec, 'missingattr')
         # Single attribute can be deleted from cache
         del rec.message
 
@@ -835,7 +1541,7 @@ class TestRecord(TestCase):
         self.assertNotEqual(records2, records5)
 
         # if client is different, records do not compare equal
-        rec2.__dict__['_model'] = sentinel.OTHER_MODEL
+        object.__setattr__(rec2, '_model', sentinel.OTHER_MODEL)
         self.assertNotEqual(rec1, rec2)
 
         self.assertCalls()
@@ -872,6 +1578,33 @@ class TestRecord(TestCase):
         self.assertCalls(OBJ('foo.bar', 'fields_get_keys'))
         self.assertOutput('')
 
+    def test_compact(self):
+        FooBar = self.model('foo.bar')
+        records = FooBar.browse([13, 17, False, 42])
+        named = erppeek.RecordList(FooBar, [(13, 'treize'), False])
+
+        self.assertEqual(records.id, [13, 17, False, 42])
+        self.assertEqual(records._idnames, [13, 17, False, 42])
+        self.assertEqual(len(records), 4)
+        self.assertIs(records[2], False)
+        self.assertEqual(records[1:].id, [17, False, 42])
+        self.assertEqual(records[:1], FooBar.browse([13]))
+        self.assertEqual(named.id, [13, False])
+        self.assertEqual(named._idnames, [(13, 'treize'), False])
+        self.assertEqual(named[0]._name, 'treize')
+        self.assertEqual(named + records[3:],
+                         erppeek.RecordList(FooBar, [13, False, 42]))
+
+        # The ids are stored in an array, and the Record has no __dict__
+        self.assertEqual(records._ids.tolist(), [13, 17, 0, 42])
+        self.assertIsNone(records._names)
+        rec = records[0]
+        self.assertRaises(AttributeError, object.__getattribute__,
+                          rec, '__dict__')
+        self.assertEqual(rec.message, 'v_message')
+        self.assertEqual(rec._values['message'], 'v_message')
+        self.assertOutput('')
+
     def test_read_duplicate(self):
         records = self.model('foo.bar').browse([17, 17])
 
@@ -899,6 +1632,188 @@ class TestRecord(TestCase):
         )
         self.assertOutput('')
 
+    def test_read_raw(self):
+        records = self.model('foo.bar').browse([13, 17])
+
+        values = records.read(raw=True)
+        self.assertEqual([val['misc_id'] for val in values], [421, 421])
+        self.assertEqual(records.read('misc_id', raw=True),
+                         ['v_misc_id', 'v_misc_id'])
+        chunks = records.read_chunks('spam', chunk_size=1, raw=True)
+        self.assertEqual(list(chunks), [['v_spam'], ['v_spam']])
+        self.assertEqual(records[42:].read(raw=True), [])
+
+        # The fields are not needed
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [13, 17], None),
+            OBJ('foo.bar', 'read', [13, 17], ['misc_id']),
+            OBJ('foo.bar', 'read', [13], ['spam']),
+            OBJ('foo.bar', 'read', [17], ['spam']),
+        )
+        self.assertOutput('')
+
+    def test_read_chunks(self):
+        records = self.model('foo.bar').browse([13, 17, 42])
+
+        values = records.read('message', chunk_size=2)
+        self.assertEqual(values, ['v_message'] * 3)
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [13, 17], ['message']),
+            OBJ('foo.bar', 'read', [42], ['message']),
+            OBJ('foo.bar', 'fields_get'),
+        )
+
+        chunks = records.read_chunks('birthdate', chunk_size=2)
+        self.assertEqual(next(chunks), ['v_birthdate'] * 2)
+        self.assertCalls(OBJ('foo.bar', 'read', [13, 17], ['birthdate']))
+        self.assertEqual(list(chunks), [['v_birthdate']])
+        self.assertCalls(OBJ('foo.bar', 'read', [42], ['birthdate']))
+
+        chunks = records.read_chunks(chunk_size=2)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual(type(values), list)
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [13, 17], None),
+            OBJ('foo.bar', 'read', [42], None),
+        )
+        self.assertOutput('')
+
+    def test_read_parallel(self):
+        records = self.model('foo.bar').browse([13, 17, 42])
+
+        values = records.read('city', parallel=2)
+        self.assertEqual(values, ['v_city'] * 3)
+        # The calls are sent concurrently, in any order
+        read_calls = [args[5] for (__, args, __) in self.service.mock_calls
+                      if args[4] == 'read']
+        self.assertEqual(sorted(read_calls), [[13, 17], [42]])
+        self.service.reset_mock()
+        self.assertOutput('')
+
+    def test_prefetch(self):
+        records = self.model('foo.bar').browse([13, 17, False, 42])
+
+        self.assertEqual([rec and rec.message for rec in records],
+                         ['v_message', 'v_message', False, 'v_message'])
+        self.assertEqual(records[1].message, 'v_message')
+        self.assertEqual(records[3].name, 'v_name')
+        self.assertCalls(
+            OBJ('foo.bar', 'fields_get_keys'),
+            OBJ('foo.bar', 'read', [13, 17, 42], ['message']),
+            OBJ('foo.bar', 'fields_get'),
+            OBJ('foo.bar', 'read', [13, 17, 42], ['name']),
+        )
+
+        # Read again after refresh or write
+        rec = records[1]
+        rec.refresh()
+        self.assertEqual(rec.message, 'v_message')
+        self.assertEqual(records[0].message, 'v_message')
+        records.write({'message': 'Hello'})
+        self.assertEqual(records[0].message, 'v_message')
+        self.assertCalls(
+            OBJ('foo.bar', 'read', [17], ['message']),
+            OBJ('foo.bar', 'write', [13, 17, False, 42],
+                {'message': 'Hello'}),
+            OBJ('foo.bar', 'read', [13, 17, 42], ['message']),
+        )
+
+        # Read again after a write through the model
+        FooBar = self.model('foo.bar')
+        FooBar.write_many({13: {'message': 'Hi'}})
+        self.assertEqual(records[0].message, 'v_message')
+        self.assertEqual(records[1].message, 'v_message')
+        FooBar.write([17], {'message': 'Bye'})
+        self.assertEqual(records[1].message, 'v_message')
+        self.assertCalls(
+            OBJ('foo.bar', 'write', [13], {'message': 'Hi'}),
+            OBJ('foo.bar', 'read', [13], ['message']),
+            OBJ('foo.bar', 'write', [17], {'message': 'Bye'}),
+            OBJ('foo.bar', 'read', [17], ['message']),
+        )
+
+        # Read again after a write or unlink of another record
+        rec = FooBar.browse(13)
+        rec.message = 'Hey'
+        self.assertEqual(records[0].message, 'v_message')
+        FooBar.browse(17).unlink()
+        self.assertEqual(records[1].message, 'v_message')
+        self.assertCalls(
+            OBJ('foo.bar', 'write', [13], {'message': 'Hey'}),
+            OBJ('foo.bar', 'read', [13], ['message']),
+            OBJ('foo.bar', 'unlink', [17]),
+            OBJ('foo.bar', 'read', [17], ['message']),
+        )
+
+        # A single call in reverse order
+        records = FooBar.browse([13, 17, 42])
+        self.assertIsNone(records._prefetch)
+        self.assertEqual([records[idx].name for idx in (2, 1, 0)],
+                         ['v_name', 'v_name', 'v_name'])
+        self.assertCalls(OBJ('foo.bar', 'read', [13, 17, 42], ['name']))
+        self.assertOutput('')
+
+    def test_identity_map(self):
+        client = erppeek.Client(self.server, self.database, self.user,
+                                self.password, identity_map=True)
+        FooBar = client.model('foo.bar')
+        self.service.reset_mock()
+
+        rec = FooBar.browse(42)
+        self.assertIs(FooBar.browse(42), rec)
+        self.assertIs(FooBar.get(42), rec)
+        self.assertIsNot(FooBar.browse(42, context={'lang': 'fr_FR'}), rec)
+        self.assertIsNot(FooBar.browse(13), rec)
+
+        self.assertEqual(rec.message, 'v_message')
+        self.assertEqual(FooBar.browse(42).message, 'v_message')
+        self.assertIs(rec.read()['misc_id'],
+                      FooBar.browse(13).read()['misc_id'])
+        self.assertCalls(
+            OBJ('foo.bar', 'fields_get_keys'),
+            OBJ('foo.bar', 'read', [42], ['message']),
+            OBJ('foo.bar', 'fields_get'),
+            OBJ('foo.bar', 'read', [42], None),
+            OBJ('foo.bar', 'read', [13], None),
+        )
+
+        # The shared record is refreshed after a write
+        FooBar.browse([13, 42]).write({'message': 'Hello'})
+        self.assertEqual(rec.message, 'v_message')
+        self.assertCalls(
+            OBJ('foo.bar', 'write', [13, 42], {'message': 'Hello'}),
+            OBJ('foo.bar', 'read', [42], ['message']),
+        )
+
+        # The records are refreshed in all the contexts in use
+        self.assertEqual(sorted(client._record_contexts['foo.bar']),
+                         ["None", "{'lang': 'fr_FR'}"])
+        rec_fr = FooBar.browse(42, context={'lang': 'fr_FR'})
+        rec_fr._update({'message': 'Bonjour'})
+        rec._update({'message': 'Hello'})
+        FooBar.write_many({42: {'message': 'Hi'}})
+        self.assertEqual(rec_fr._values, {})
+        self.assertEqual(rec._values, {})
+        self.service.reset_mock()
+
+        # The other contexts are refreshed after a write of the record
+        rec_fr._update({'message': 'Bonjour'})
+        rec.message = 'Hey'
+        self.assertEqual(rec_fr._values, {})
+        rec_fr._update({'message': 'Bonjour'})
+        rec.unlink()
+        self.assertEqual(rec_fr._values, {})
+        self.assertCalls(
+            OBJ('foo.bar', 'write', [42], {'message': 'Hey'}),
+            OBJ('foo.bar', 'unlink', [42]),
+        )
+
+        # The records are not kept alive by the identity map
+        del rec, rec_fr
+        gc.collect()
+        self.assertFalse([key for key in client._records if key[1] == 42])
+        self.assertOutput('')
+
     def test_str(self):
         records = erppeek.RecordList(self.model('foo.bar'), [(13, 'treize'), (17, 'dix-sept')])
         rec1 = self.model('foo.bar').browse(42)
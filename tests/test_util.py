@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import unittest2
 
-from erppeek import issearchdomain, searchargs
+from erppeek import Domain, issearchdomain, literal_eval, searchargs
 
 
 class TestUtils(unittest2.TestCase):
@@ -92,6 +92,84 @@ class TestUtils(unittest2.TestCase):
         self.assertEqual(searchargs((['elapsed = 67891234567.0'],)),
                          ([('elapsed', '=', 67891234567.0)],))
 
+    def test_searchargs_copy(self):
+        domain = ['name = mushroom', ('state', 'in', ['draft'])]
+        parsed = [('name', '=', 'mushroom'), ('state', 'in', ['draft'])]
+
+        self.assertEqual(searchargs((domain,)), (parsed,))
+        # The domain is not modified
+        self.assertEqual(domain[0], 'name = mushroom')
+        self.assertIsNot(searchargs((domain,))[0], domain)
+
+        # The cached values are not shared
+        domain = ['state in ["draft"]']
+        searchargs((domain,))[0][0][2].append('done')
+        self.assertEqual(searchargs((domain,)),
+                         ([('state', 'in', ['draft'])],))
+        domain = ['x = {"a": [1]}', 'y in ([1], [2])']
+        parsed = searchargs((domain,))[0]
+        parsed[0][2]['a'].append(2)
+        parsed[1][2][0].append(2)
+        self.assertEqual(searchargs((domain,)),
+                         ([('x', '=', {'a': [1]}), ('y', 'in', ([1], [2]))],))
+
+    def test_domain(self):
+        domain = Domain(['name = mushroom', '|', ('state', '=', 'draft'),
+                         'state = open'])
+        wire = [('name', '=', 'mushroom'), '|', ('state', '=', 'draft'),
+                ('state', '=', 'open')]
+
+        self.assertTrue(issearchdomain(domain))
+        self.assertTrue(issearchdomain(Domain()))
+        self.assertEqual(domain.to_list(), wire)
+        self.assertEqual(searchargs((domain,)), (wire,))
+        self.assertEqual(searchargs((domain,), {'limit': 3}, {'lang': 'fr'}),
+                         (wire, 0, 3, None, {'lang': 'fr'}))
+        self.assertEqual(domain, wire)
+        self.assertEqual(len(domain), 4)
+        self.assertEqual(list(domain), wire)
+        self.assertEqual(Domain(domain), domain)
+
+        # Combined with lists or other domains
+        self.assertEqual(domain + ['name != spam'],
+                         wire + [('name', '!=', 'spam')])
+        self.assertEqual(['name != spam'] + domain,
+                         [('name', '!=', 'spam')] + wire)
+        self.assertIsInstance(domain + Domain(), Domain)
+        self.assertEqual(domain, wire)
+
+        self.assertRaises(AttributeError, setattr, domain, 'terms', ())
+        domain = Domain(['x = {"a": [1]}'])
+        domain.to_list()[0][2]['a'].append(2)
+        self.assertEqual(domain.to_list(), [('x', '=', {'a': [1]})])
+        self.assertRaises(ValueError, Domain, ['ham == 2'])
+        self.assertEqual(repr(Domain(['name = spam'])),
+                         "Domain([('name', '=', 'spam')])")
+
+    def test_literal_eval(self):
+        self.assertEqual(literal_eval('42'), 42)
+        self.assertEqual(literal_eval('4.2'), 4.2)
+        self.assertEqual(literal_eval('"draft"'), 'draft')
+        self.assertEqual(literal_eval("'a, b'"), 'a, b')
+        self.assertIs(literal_eval('True'), True)
+        self.assertIsNone(literal_eval('None'))
+        self.assertEqual(literal_eval('[1, "two", 3.0, False]'),
+                         [1, 'two', 3.0, False])
+        self.assertEqual(literal_eval('(1,)'), (1,))
+        self.assertEqual(literal_eval('(1)'), 1)
+        self.assertEqual(literal_eval('()'), ())
+
+        # Nested values and escapes are parsed by the compiler
+        self.assertEqual(literal_eval('[(1, 2), [3]]'), [(1, 2), [3]])
+        self.assertEqual(literal_eval('{"a": 1}'), {'a': 1})
+        self.assertEqual(literal_eval(r'"it\'s"'), "it's")
+
+        self.assertRaises(ValueError, literal_eval, 'draft')
+        self.assertRaises(ValueError, literal_eval, '[1, draft]')
+        self.assertRaises(ValueError, literal_eval, '2147483648')
+        self.assertRaises(SyntaxError, literal_eval, '042')
+        self.assertRaises(SyntaxError, literal_eval, '[1,,2]')
+
     def test_searchargs_invalid(self):
 
         # No longer recognized as a search domain, since 1.6